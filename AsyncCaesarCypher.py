@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# Asyncio versions of the writer and reader of CaesarCypher.py.
+# Files are exactly the same as the ones written and read by CaesarCypher: the cypher is applied to whole buffers
+# and the file operations are run in an executor, so they never block the event loop.
+#
+# Copyright (C) 2014 Glenderin/Elnath
+#
+# Licensed under the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of (the) Author shall not be used in advertising or
+# otherwise to promote the sale, use or other dealings in this Software without
+# prior written authorization from (the)Author.
+
+import asyncio
+import codecs
+
+import CaesarCypher
+
+
+class _AsyncFile():
+	"""
+		Base class of the async writer and reader: runs the blocking file operations in an executor.
+	"""
+	def __init__(self, filename, binary, executor):
+		if not isinstance(filename, str):
+			raise TypeError("Filename must be a string")
+		self.file = None
+		self.binary = binary
+		self._filename = filename
+		self._executor = executor
+
+	async def _run(self, function, *args):
+		return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+	def _checkOpen(self):
+		if self.file is None:
+			raise ValueError("The file is not open: call open() first")
+
+	async def __aenter__(self):
+		await self.open()
+		return self
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		await self.close()
+
+
+class AsyncCaesarWriter(_AsyncFile):
+	def __init__(self, filename, offset = None, binary = False, buffer_size = CaesarCypher.CHUNK_SIZE, executor = None):
+		"""
+		Creates an object used to write an encrypted file from a coroutine.
+
+		:param filename: The name of the file that will be written.
+		:param offset: The number that is added to the value of every byte. Must be between 0 and 255. If None, a random number is generated.
+		:param binary: If True, the file is written in the format of CaesarBinaryWriter, otherwise in the format of CaesarWriter.
+		:param buffer_size: Encrypted data is kept in memory until there are buffer_size bytes, then it is written to the file at once.
+			A call to :func:`write` that fills the buffer waits until the data is written, so fast producers are slowed down
+			to the speed of the disk instead of filling the memory.
+		:param executor: The executor used for file operations. If None, the default executor of the event loop is used.
+
+		The file is opened by :func:`open` or when entering an `async with` block.
+		"""
+		_AsyncFile.__init__(self, filename, binary, executor)
+		self.offset = CaesarCypher._check_offset(offset)
+		self.buffer_size = buffer_size
+		if binary:
+			self._table = CaesarCypher._binary_encode_table(self.offset)
+		else:
+			self._table = CaesarCypher._encode_table(self.offset)
+		self._pending = []
+		self._pendingSize = 0
+		self._lock = None
+
+	async def open(self):
+		"""
+		Opens the file and writes the offset at its beginning.
+		"""
+		self._lock = asyncio.Lock()
+		self.file = await self._run(open, self._filename, "wb")
+		if self.binary:
+			self._pending.append(bytes(bytearray([self.offset])))
+		else:
+			self._pending.append(chr(self.offset).encode("utf-8"))
+		self._pendingSize = len(self._pending[0])
+
+	async def write(self, data):
+		"""
+		Encrypts some data and adds it to the buffer.
+
+		:param data: bytes-like object. A str is encoded in utf-8 first.
+		"""
+		if isinstance(data, str):
+			data = data.encode("utf-8")
+		data = CaesarCypher._translate(bytes(data), self._table)
+		if not self.binary:
+			# Converted bytes are all < 256, so latin-1 maps them to the same unicode code points
+			data = data.decode("latin-1").encode("utf-8")
+		self._pending.append(data)
+		self._pendingSize += len(data)
+		if self._pendingSize >= self.buffer_size:
+			await self.flush()
+
+	async def writelines(self, lines):
+		"""
+		Writes multiple pieces of data to the file.
+		"""
+		for element in lines:
+			await self.write(element)
+
+	async def flush(self):
+		"""
+		Writes the buffer to the file.
+		"""
+		self._checkOpen()
+		# The lock keeps the buffers in order when several tasks write to the same object
+		async with self._lock:
+			if not self._pending:
+				return
+			data = b"".join(self._pending)
+			self._pending = []
+			self._pendingSize = 0
+			await self._run(self.file.write, data)
+
+	async def close(self):
+		"""
+		Writes the buffer and closes the file. Does nothing if the file is not open.
+		"""
+		if self.file is None:
+			return
+		await self.flush()
+		await self._run(self.file.close)
+		self.file = None
+
+
+class AsyncCaesarReader(_AsyncFile):
+	def __init__(self, filename, binary = False, chunk_size = CaesarCypher.CHUNK_SIZE, executor = None):
+		"""
+		Creates an object used to read an encrypted file from a coroutine.
+
+		:param filename: The name of the file to open.
+		:param binary: If True, the file is read in the format of CaesarBinaryWriter, otherwise in the format of CaesarWriter.
+		:param chunk_size: How many bytes are read from the file at once by :func:`readline` and when iterating over the object.
+		:param executor: The executor used for file operations. If None, the default executor of the event loop is used.
+
+		Data is returned as bytes. The object supports `async for` to iterate over the lines of the file.
+		The file is opened by :func:`open` or when entering an `async with` block.
+		"""
+		_AsyncFile.__init__(self, filename, binary, executor)
+		self.chunk_size = chunk_size
+		self.offset = None
+		self._table = None
+		self._decoder = None
+		self._buffer = b""
+		self._bufferPos = 0
+
+	async def open(self):
+		"""
+		Opens the file and reads the offset at its beginning.
+		"""
+		self.file = await self._run(open, self._filename, "rb")
+		first = await self._run(self.file.read, 1)
+		if self.binary:
+			self.offset = first[0]
+			self._table = CaesarCypher._binary_decode_table(self.offset)
+		else:
+			if first >= b"\x80":
+				first += await self._run(self.file.read, 1)
+			self.offset = ord(first.decode("utf-8"))
+			self._table = CaesarCypher._decode_table(self.offset)
+			self._decoder = codecs.getincrementaldecoder("utf-8")()
+
+	async def _readDecrypted(self, size):
+		while True:
+			data = await self._run(self.file.read, size)
+			if self.binary:
+				return CaesarCypher._translate(data, self._table)
+			result = CaesarCypher._translate(self._decoder.decode(data, not data).encode("latin-1"), self._table)
+			# A read can stop in the middle of a character: then nothing is decoded but the file is not finished
+			if result or not data:
+				return result
+
+	async def read(self, size = -1):
+		"""
+		Reads size bytes from the file.
+		"""
+		if self._bufferPos < len(self._buffer):
+			# Some data is still waiting in the buffer (left by readline): it is returned first
+			if size is None or size < 0:
+				result = self._buffer[self._bufferPos:] + await self._readDecrypted(-1)
+				self._buffer = b""
+				self._bufferPos = 0
+			else:
+				result = self._buffer[self._bufferPos:self._bufferPos+size]
+				self._bufferPos += len(result)
+			return result
+		return await self._readDecrypted(-1 if size is None else size)
+
+	async def readline(self):
+		"""
+		Reads from the file till a line break or EOF is found.
+		"""
+		while True:
+			end = self._buffer.find(b"\n", self._bufferPos)
+			if end != -1:
+				result = self._buffer[self._bufferPos:end+1]
+				self._bufferPos = end+1
+				return result
+			chunk = await self._readDecrypted(self.chunk_size)
+			if chunk == b"":  # This is the End of the file
+				result = self._buffer[self._bufferPos:]
+				self._buffer = b""
+				self._bufferPos = 0
+				return result
+			self._buffer = self._buffer[self._bufferPos:] + chunk
+			self._bufferPos = 0
+
+	async def close(self):
+		"""
+		Closes the file. Does nothing if the file is not open.
+		"""
+		if self.file is None:
+			return
+		await self._run(self.file.close)
+		self.file = None
+
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self):
+		line = await self.readline()
+		if line == b"":
+			raise StopAsyncIteration
+		return line
+
+
+if __name__ == '__main__':
+	# Example of utilisation: several files written concurrently in the same event loop
+	async def example(name):
+		async with AsyncCaesarWriter(name) as writer:
+			await writer.write("First line\n")
+			await writer.write("A second line with somê sp€ciàl ch@rs§\n")
+		async with AsyncCaesarReader(name) as reader:
+			async for line in reader:
+				print(name, line.decode("utf-8"), end="")
+
+	async def main():
+		await asyncio.gather(*(example("asyncCaesarTest%d.txt" % i) for i in range(3)))
+
+	asyncio.run(main())
@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+	CaesarBenchmark.py
+	Throughput and memory benchmarks for CaesarCypher.py.
+	Times CaesarWriter.write, CaesarReader.read/readline/readlines, encrypt() and decrypt() on generated data of several sizes and
+	character distributions, and prints the results as JSON so they can be compared between versions.
+	Every benchmark runs in its own process, so the peak RSS reported is the one of this benchmark only.
+	Nothing is downloaded: data is generated and files are written in a temporary directory.
+
+	Usage: python -m CaesarBenchmark [--sizes 65536 1048576] [--distributions ascii latin-1] [--benchmarks write read] [--output results.json]
+
+	This module is distributed under the MIT License
+
+	Copyright (c) 2014 Glenderin/Elnath
+
+	Permission is hereby granted, free of charge, to any person obtaining a copy
+	of this software and associated documentation files (the "Software"), to deal
+	in the Software without restriction, including without limitation the rights
+	to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+	copies of the Software, and to permit persons to whom the Software is
+	furnished to do so, subject to the following conditions:
+
+	The above copyright notice and this permission notice shall be included in
+	all copies or substantial portions of the Software.
+
+	THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+	IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+	FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+	AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+	LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+	OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+	THE SOFTWARE.
+
+	Except as contained in this notice, the name(s) of (the) Author shall not be used in advertising or
+	otherwise to promote the sale, use or other dealings in this Software without
+	prior written authorization from (the )Author.
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+	from Queue import Empty
+except ImportError: #Python 3
+	from queue import Empty
+
+try:
+	import resource
+except ImportError: #Not available on Windows: peak RSS won't be reported
+	resource = None
+
+import CaesarCypher
+
+SIZES = [64*1024, 1024*1024, 16*1024*1024]
+CALL_SIZE = 4096 #Size of the data given to or asked from every call of write and read
+LINE_LENGTH = 80 #Generated data has a line break every LINE_LENGTH characters (on average)
+
+#Characters used to generate the data of every distribution. Multi-byte characters are written as their utf-8 bytes.
+_ASCII = [chr(c) for c in range(32, 127)]
+_LATIN1 = [chr(c) for c in range(0, 256) if c != 10]
+_MULTIBYTE = _ASCII + [c.encode("utf-8") for c in u"éèàçùêôñßæøå€§£¥漢字日本語한국어αβγδ"]
+DISTRIBUTIONS = {
+	"ascii": _ASCII,
+	"latin-1": _LATIN1,
+	"multibyte": _MULTIBYTE,
+}
+
+def make_data(distribution, size, seed = 0):
+	"""Returns size bytes of data made of the characters of the given distribution, with line breaks"""
+	rand = random.Random(seed)
+	characters = DISTRIBUTIONS[distribution]
+	#A random block is repeated to build the data quickly: its content doesn't change the speed of the cypher
+	block = []
+	for i in range(64*1024 // LINE_LENGTH):
+		block.extend(rand.choice(characters) for j in range(rand.randint(1, 2*LINE_LENGTH)))
+		block.append("\n")
+	block = "".join(block)
+	return (block * (size // len(block) + 1))[:size]
+
+def _timed(function, *args):
+	start = time.time()
+	result = function(*args)
+	return time.time() - start, result
+
+# **** Benchmarks ****
+# Every benchmark receives a temporary directory and the data, and returns the duration of every call it measured (in seconds)
+
+def bench_write(directory, data):
+	samples = []
+	with CaesarCypher.CaesarWriter(os.path.join(directory, "write.caesar"), 42) as writer:
+		for i in range(0, len(data), CALL_SIZE):
+			samples.append(_timed(writer.write, data[i:i+CALL_SIZE])[0])
+		samples.append(_timed(writer.flush)[0])
+	return samples
+
+def _encrypted_file(directory, data):
+	"""Writes data to an encrypted file (not timed) and returns its name"""
+	name = os.path.join(directory, "read.caesar")
+	with CaesarCypher.CaesarWriter(name, 42) as writer:
+		writer.write(data)
+	return name
+
+def bench_read(directory, data):
+	samples = []
+	with CaesarCypher.CaesarReader(_encrypted_file(directory, data)) as reader:
+		while True:
+			duration, chunk = _timed(reader.read, CALL_SIZE)
+			samples.append(duration)
+			if chunk == "":
+				return samples
+
+def bench_readline(directory, data):
+	samples = []
+	with CaesarCypher.CaesarReader(_encrypted_file(directory, data)) as reader:
+		while True:
+			duration, line = _timed(reader.readline)
+			samples.append(duration)
+			if line == "":
+				return samples
+
+def bench_readlines(directory, data):
+	with CaesarCypher.CaesarReader(_encrypted_file(directory, data)) as reader:
+		return [_timed(reader.readlines)[0]]
+
+def bench_encrypt(directory, data):
+	name = os.path.join(directory, "plain.txt")
+	with open(name, "wb") as writer:
+		writer.write(data)
+	return [_timed(CaesarCypher.encrypt, name, os.path.join(directory, "encrypt.caesar"), 42)[0]]
+
+def bench_decrypt(directory, data):
+	return [_timed(CaesarCypher.decrypt, _encrypted_file(directory, data), os.path.join(directory, "decrypt.txt"))[0]]
+
+BENCHMARKS = {
+	"write": bench_write,
+	"read": bench_read,
+	"readline": bench_readline,
+	"readlines": bench_readlines,
+	"encrypt": bench_encrypt,
+	"decrypt": bench_decrypt,
+}
+
+def _percentile(samples, percent):
+	"""samples must be sorted"""
+	return samples[min(len(samples) - 1, int(len(samples) * percent / 100.0))]
+
+def _run_case(benchmark, distribution, size, results):
+	"""Runs one benchmark and puts its result in the results queue. Meant to be run in a child process."""
+	data = make_data(distribution, size)
+	directory = tempfile.mkdtemp(prefix = "caesarbench")
+	try:
+		samples = BENCHMARKS[benchmark](directory, data)
+	finally:
+		shutil.rmtree(directory)
+	total = sum(samples)
+	samples.sort()
+	result = {
+		"benchmark": benchmark,
+		"distribution": distribution,
+		"size": size,
+		"seconds": total,
+		"MB/s": size / total / 1e6 if total > 0 else None,
+		"calls": len(samples),
+		"latency": {
+			"p50": _percentile(samples, 50),
+			"p90": _percentile(samples, 90),
+			"p99": _percentile(samples, 99),
+			"max": samples[-1],
+		},
+		"peak_rss_kb": None,
+	}
+	if resource is not None:
+		rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		result["peak_rss_kb"] = rss // 1024 if sys.platform == "darwin" else rss #macOS gives bytes, Linux gives kilobytes
+	results.put(result)
+
+def _wait_result(process, queue):
+	"""Returns the result put in the queue by process, or None if the process ended without giving one (it raised an exception)"""
+	while True:
+		alive = process.is_alive()
+		try:
+			return queue.get(timeout = 1)
+		except Empty:
+			if not alive:
+				return None
+
+def run(benchmarks = None, distributions = None, sizes = None):
+	"""
+	Runs every combination of benchmark, distribution and size and returns the list of results.
+	A case that fails gives a result with an "error" key instead of the measures.
+	"""
+	results = []
+	queue = multiprocessing.Queue()
+	for benchmark in benchmarks or sorted(BENCHMARKS):
+		for distribution in distributions or sorted(DISTRIBUTIONS):
+			for size in sizes or SIZES:
+				process = multiprocessing.Process(target = _run_case, args = (benchmark, distribution, size, queue))
+				process.start()
+				result = _wait_result(process, queue)
+				process.join()
+				if result is None:
+					result = {
+						"benchmark": benchmark,
+						"distribution": distribution,
+						"size": size,
+						"error": "the benchmark process failed with exit code %s" % process.exitcode,
+					}
+				results.append(result)
+	return results
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Benchmarks for CaesarCypher")
+	parser.add_argument("--benchmarks", nargs = "+", choices = sorted(BENCHMARKS), help = "benchmarks to run (default: all)")
+	parser.add_argument("--distributions", nargs = "+", choices = sorted(DISTRIBUTIONS), help = "character distributions of the data (default: all)")
+	parser.add_argument("--sizes", nargs = "+", type = int, help = "sizes of the data in bytes (default: %s)" % " ".join(str(s) for s in SIZES))
+	parser.add_argument("--output", help = "file where the JSON results are written (default: stdout)")
+	args = parser.parse_args(argv)
+	if sys.version_info[0] >= 3:
+		parser.exit(2, "CaesarBenchmark needs Python 2, like CaesarCypher (CaesarWriter uses unichr). Run it with python2 -m CaesarBenchmark\n")
+
+	results = run(args.benchmarks, args.distributions, args.sizes)
+	report = {
+		"python": sys.version.split()[0],
+		"platform": sys.platform,
+		"time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+		"results": results,
+	}
+	for result in results: #A short summary on stderr, the JSON stays clean on stdout
+		if "error" in result:
+			print("%-10s %-10s %10d bytes FAILED: %s" % (result["benchmark"], result["distribution"], result["size"], result["error"]), file = sys.stderr)
+			continue
+		print("%-10s %-10s %10d bytes %10.1f MB/s  p99 %.6fs  peak RSS %s kB" % (result["benchmark"], result["distribution"], result["size"],
+			result["MB/s"] or 0, result["latency"]["p99"], result["peak_rss_kb"]), file = sys.stderr)
+	if args.output:
+		with open(args.output, "w") as output:
+			json.dump(report, output, indent = 2)
+	else:
+		json.dump(report, sys.stdout, indent = 2)
+		print()
+	if any("error" in result for result in results):
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
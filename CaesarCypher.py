@@ -37,14 +37,105 @@
 """
 
 import codecs
+import mmap
+import multiprocessing
+import os
 import random
+from contextlib import closing
+
+try:
+	import numpy
+except ImportError: #NumPy is optional: without it the "numpy" backend falls back to the pure Python one
+	numpy = None
+
+CHUNK_SIZE = 1024*1024 #Default number of bytes processed at once when streaming a file
+SHARD_SIZE = 16*1024*1024 #Default number of bytes of a file processed by one process of parallel_encrypt/parallel_decrypt
+
+#Flush policies of CaesarWriter
+FLUSH_ON_SIZE = "size"
+FLUSH_ON_NEWLINE = "newline"
+FLUSH_ON_CLOSE = "close"
+
+_UTF8_CONTINUATION = "".join(chr(b) for b in range(0x80, 0xC0)) #Bytes that can't start a utf-8 character
+
+def _check_offset(offset):
+	"""Validates an offset passed to a writer and returns it as an int. A random offset is returned for None."""
+	if offset == None:
+		offset = random.randint(1, 254) #We don't include 0 and 255, because that will mean characters are not converted so the file is human-readable.
+	elif not isinstance(offset, int): #offset is passed: we verify if it is a integer
+		try:
+			offset = int(offset)
+		except ValueError:
+			raise TypeError("Offset must be a int, castable to int or None")
+	if offset < 0:
+		offset = -offset
+	if offset > 255:
+		raise ValueError("Offset must be between 0 and 255")
+	return offset
+
+# **** Backends ****
+# Every conversion of the module goes through _translate. The "python" backend uses str.translate, the "numpy" backend loads
+# the data in a uint8 array and converts it with one vectorized lookup. Both give exactly the same result.
+
+_backend = "python"
+
+def set_backend(name):
+	"""
+		Chooses how data is converted: "python" or "numpy".
+		If NumPy is not installed, the "python" backend is used instead of "numpy".
+		Returns the name of the backend in use.
+	"""
+	global _backend
+	if name not in ("python", "numpy"):
+		raise ValueError("Unknown backend: %s" % name)
+	if name == "numpy" and numpy is None:
+		name = "python"
+	_backend = name
+	return _backend
+
+def get_backend():
+	"""Returns the name of the backend in use"""
+	return _backend
+
+def _translate(data, table):
+	"""Converts every byte of data with the 256 bytes table"""
+	if _backend == "numpy" and data:
+		return numpy.frombuffer(table, dtype = numpy.uint8)[numpy.frombuffer(data, dtype = numpy.uint8)].tobytes()
+	return data.translate(table)
+
+def _encode_table(offset):
+	"""Returns the 256 characters translation table used to encrypt a byte string with the given offset"""
+	return bytes(bytearray((b + offset) % 255 for b in range(256))) #If > 255, then it will be its value-255
+
+def _decode_table(offset):
+	"""Returns the 256 characters translation table used to decrypt a byte string with the given offset"""
+	table = bytearray()
+	for b in range(256):
+		x = b - offset
+		if x <= 0:
+			x = x+255
+		table.append(x)
+	return bytes(table)
+
+def _binary_encode_table(offset):
+	"""Returns the translation table used to encrypt binary data. Unlike the text table it is a bijection on the 256 byte values."""
+	return bytes(bytearray((b + offset) % 256 for b in range(256)))
+
+def _binary_decode_table(offset):
+	"""Returns the translation table used to decrypt binary data."""
+	return bytes(bytearray((b - offset) % 256 for b in range(256)))
 
 class CaesarWriter():
-	def __init__(self, filename, offset = None):
+	def __init__(self, filename, offset = None, buffer_size = CHUNK_SIZE, flush_policy = FLUSH_ON_SIZE):
 		"""
 			Creates an object used to write the encrypted file.
 			*filename (string): the name of the file that will be written.
 			*offset (int): the number that is added to the value of every character. Must be between 0 and 255. If None, a random number is generated.
+			*buffer_size (int): how many bytes of encrypted text are kept in memory before being written to the file.
+			*flush_policy (string): when the buffer is written to the file:
+				-FLUSH_ON_SIZE: when it contains buffer_size bytes.
+				-FLUSH_ON_NEWLINE: when a line break is written or when it contains buffer_size bytes.
+				-FLUSH_ON_CLOSE: only when the object is closed (or when you call flush). The buffer can grow without limit.
 			
 			You can access the file opened by this object with his file attribute (but it is not recommended).
 			The offset value is stored in the offset attribute
@@ -54,19 +145,18 @@ class CaesarWriter():
 			How it works:
 			A file is created with codecs.open(filename, "wb", encoding = "utf-8"), the first character written to the file is the offset(so we can read it later).
 			When you use the write method, every character is converted to its numeric value, offset is added, and then it is converted to the character value and written to the file.
+			The conversion is done with a translation table computed once for the object, so a whole string is converted in one call.
+			Converted text is buffered, so many small writes end up in a single write to the file.
 		"""
-		if offset == None:
-			offset = random.randint(1, 254) #We don't include 0 and 255, because that will mean characters are not converted so the file is human-readable.
-		elif not isinstance(offset, int): #offset is passed: we verify if it is a integer
-			try:
-				offset = int(offset)
-			except ValueError:
-				raise TypeError("Offset must be a int, castable to int or None")
-		if offset < 0:
-			offset = -offset
-		if offset > 255:
-			raise ValueError("Offset must be between 0 and 255")
+		offset = _check_offset(offset)
 		self.offset = offset
+		self._table = _encode_table(offset)
+		if flush_policy not in (FLUSH_ON_SIZE, FLUSH_ON_NEWLINE, FLUSH_ON_CLOSE):
+			raise ValueError("Unknown flush policy: %s" % flush_policy)
+		self.buffer_size = buffer_size
+		self.flush_policy = flush_policy
+		self._pending = []
+		self._pendingSize = 0
 		
 		if isinstance(filename, str):
 			self.file = codecs.open(filename, "wb", encoding = "utf-8")
@@ -79,17 +169,30 @@ class CaesarWriter():
 		"""Writes some text to the file"""
 		if not isinstance(text, str):
 			text = str(text)
-		for c in text:
-			x = (ord(c) + self.offset) % 255 #If > 255, then it will be its value-255 
-			self.file.write(unichr(x))
+		self._pending.append(_translate(text, self._table))
+		self._pendingSize += len(text)
+		if self.flush_policy == FLUSH_ON_CLOSE:
+			return
+		if self._pendingSize >= self.buffer_size or (self.flush_policy == FLUSH_ON_NEWLINE and "\n" in text):
+			self.flush()
 	
 	def writelines(self, lines):
 		"""Writes multiple lines to the file."""
 		for element in lines:
 			self.write(element)
 	
+	def flush(self):
+		"""Writes the buffered text to the file"""
+		if self._pending:
+			#Converted characters are all < 256, so latin-1 maps them to the same unicode code points
+			self.file.write("".join(self._pending).decode("latin-1"))
+			self._pending = []
+			self._pendingSize = 0
+		self.file.flush()
+	
 	def close(self):
 		"""Close the file attached to the object. """
+		self.flush()
 		self.file.close()
 		
 	def __enter__(writer):
@@ -99,58 +202,217 @@ class CaesarWriter():
 		self.close()
 
 class CaesarReader():
-	def __init__(self, filename):
+	def __init__(self, filename, chunk_size = CHUNK_SIZE):
 		"""
 			Creates an object used to read the encrypted file.
 			*filename (string): the name of the file to open.
+			*chunk_size (int): how many bytes are read from the file at once by readline and when iterating over the object.
 			
 			Returns unicode encoded strings.
 			You can access the file opened by this object with his file attribute (but it is not recommended).
 			You can access the offset with the offset attribute.
 			Don't forget to close the object at the end. Or you can use a with statement, that's better
 			It supports the with statement.
+			Iterating over the object yields the lines of the file, without loading the whole file in memory.
+			The encrypted file is utf-8, so a character of the file doesn't always take the same number of bytes: seek has to read
+			the file to find a position. Use CaesarBinaryWriter and CaesarBinaryReader if you need fast random access.
 		"""
 		if isinstance(filename, str):
 			self.file = codecs.open(filename, "rb", encoding = "utf-8")
 		else:
 			raise TypeError("Filename argument must be a string")
+		self.chunk_size = chunk_size
 			
 		self.offset = ord(self.file.read(1)) #The first char in the file is the offset
+		self._table = _decode_table(self.offset)
+		self._headerSize = len(unichr(self.offset).encode("utf-8"))
+		self._position = 0 #Number of bytes of decrypted data already returned
+		#Decrypted data read from the file but not returned yet. Everything before _bufferPos was already returned.
+		self._buffer = ""
+		self._bufferPos = 0
+	
+	def _decrypt(self, buffer):
+		return _translate(buffer.encode("latin-1"), self._table)
 	
 	def read(self, size = None):
 		"""Reads size bytes from the file"""
-		result = ""
-		buffer = self.file.read(size)
-		for c in buffer:
-			x = ord(c) - self.offset
-			if x <= 0:
-				x = x+255
-			result += chr(x)
+		if self._bufferPos < len(self._buffer):
+			#Some data is still waiting in the buffer (left by readline): it is returned first
+			if size is None or size < 0:
+				result = self._buffer[self._bufferPos:] + self._decrypt(self.file.read(size))
+				self._buffer = ""
+				self._bufferPos = 0
+			else:
+				result = self._buffer[self._bufferPos:self._bufferPos+size]
+				self._bufferPos += len(result)
+		else:
+			result = self._decrypt(self.file.read(size))
+		self._position += len(result)
 		return result
 	
 	def readline(self):
 		"""Reads from the file till a line break or EOF is found"""
-		result = ""
-		readloop = True
-		while readloop:
-			c = self.read(1)
-			result += c
-			if c == "": #This is the End of the file
-				readloop = False
-			if c == "\n":
-				readloop = False
-		return result
+		while True:
+			end = self._buffer.find("\n", self._bufferPos)
+			if end != -1:
+				result = self._buffer[self._bufferPos:end+1]
+				self._bufferPos = end+1
+				self._position += len(result)
+				return result
+			chunk = self._decrypt(self.file.read(self.chunk_size))
+			if chunk == "": #This is the End of the file
+				result = self._buffer[self._bufferPos:]
+				self._buffer = ""
+				self._bufferPos = 0
+				self._position += len(result)
+				return result
+			self._buffer = self._buffer[self._bufferPos:] + chunk
+			self._bufferPos = 0
 	
 	def readlines(self):
-		result = []
-		readloop = True
-		while readloop:
+		"""Reads all the lines of the file and returns them in a list"""
+		return list(self)
+	
+	def tell(self):
+		"""Returns the current position in the decrypted data"""
+		return self._position
+	
+	def seek(self, offset):
+		"""
+			Moves to the given position in the decrypted data.
+			Moving forward reads the file from the current position, moving backward reads it from the beginning.
+		"""
+		if offset < self._position:
+			self.file.seek(self._headerSize) #This also resets the decoder of the file
+			self._buffer = ""
+			self._bufferPos = 0
+			self._position = 0
+		while self._position < offset:
+			if self.read(min(offset - self._position, self.chunk_size)) == "": #This is the End of the file
+				break
+	
+	def read_at(self, offset, size):
+		"""
+			Reads size bytes starting at the given position in the decrypted data, without changing the current position.
+			It uses seek twice, so the file is read to find the positions: use CaesarBinaryReader.read_at for fast random access.
+		"""
+		position = self.tell()
+		self.seek(offset)
+		try:
+			return self.read(size)
+		finally:
+			self.seek(position)
+	
+	def close(self):
+		"""Close the file attached to the object."""
+		self.file.close()
+	
+	def __iter__(self):
+		while True:
 			line = self.readline()
 			if line == "":
-				readloop = False
-			else:
-				result.append(line)
-		return result
+				return
+			yield line
+	
+	def __enter__(writer):
+		return writer
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.file.close()
+		
+class CaesarBinaryWriter():
+	def __init__(self, filename, offset = None):
+		"""
+			Creates an object used to write an encrypted binary file.
+			*filename (string): the name of the file that will be written.
+			*offset (int): the number that is added to the value of every byte. Must be between 0 and 255. If None, a random number is generated.
+			
+			Works like CaesarWriter, but for any kind of data: the file is opened in binary mode, the first byte is the offset and
+			every byte written is (byte + offset) % 256, so the encrypted file has the same size as the data (plus one byte).
+			Files written by this class must be read with CaesarBinaryReader, not CaesarReader.
+			It supports the with statement.
+		"""
+		offset = _check_offset(offset)
+		self.offset = offset
+		self._table = _binary_encode_table(offset)
+		
+		if isinstance(filename, str):
+			self.file = open(filename, "wb")
+		else:
+			raise TypeError("Filename must be a string")
+		
+		self.file.write(chr(self.offset)) #The first byte in the file will be the offset so we can retrieve it when we read the file
+	
+	def write(self, data):
+		"""Writes some data (a string, bytearray, buffer or memoryview) to the file"""
+		if isinstance(data, memoryview):
+			data = data.tobytes()
+		elif not isinstance(data, str):
+			data = str(data)
+		self.file.write(_translate(data, self._table))
+	
+	def writelines(self, lines):
+		"""Writes multiple pieces of data to the file."""
+		for element in lines:
+			self.write(element)
+	
+	def close(self):
+		"""Close the file attached to the object. """
+		self.file.close()
+		
+	def __enter__(writer):
+		return writer
+	
+	def __exit__(self, exc_type, exc_value, traceback):
+		self.close()
+
+class CaesarBinaryReader():
+	def __init__(self, filename):
+		"""
+			Creates an object used to read a file written by CaesarBinaryWriter.
+			*filename (string): the name of the file to open.
+			
+			Returns byte strings.
+			You can access the offset with the offset attribute.
+			It supports the with statement.
+		"""
+		if isinstance(filename, str):
+			self.file = open(filename, "rb")
+		else:
+			raise TypeError("Filename argument must be a string")
+		
+		self.offset = ord(self.file.read(1)) #The first byte in the file is the offset
+		self._table = _binary_decode_table(self.offset)
+	
+	def read(self, size = -1):
+		"""Reads size bytes from the file"""
+		return _translate(self.file.read(size), self._table)
+	
+	def tell(self):
+		"""Returns the current position in the decrypted data"""
+		return self.file.tell() - 1
+	
+	def seek(self, offset, whence = os.SEEK_SET):
+		"""
+			Moves to the given position in the decrypted data. whence works like for file objects.
+			Every byte of data is stored in one byte of the file, so this doesn't need to read the file.
+		"""
+		if whence == os.SEEK_SET:
+			offset += 1 #Skip the offset byte
+		self.file.seek(offset, whence)
+		if self.file.tell() < 1:
+			self.file.seek(1)
+	
+	def read_at(self, offset, size):
+		"""Reads size bytes starting at the given position in the decrypted data, without changing the current position"""
+		if hasattr(os, "pread"):
+			data = os.pread(self.file.fileno(), size, offset + 1)
+		else:
+			position = self.file.tell()
+			self.file.seek(offset + 1)
+			data = self.file.read(size)
+			self.file.seek(position)
+		return _translate(data, self._table)
 	
 	def close(self):
 		"""Close the file attached to the object."""
@@ -160,20 +422,229 @@ class CaesarReader():
 		return writer
 	
 	def __exit__(self, exc_type, exc_value, traceback):
-		self.file.close()
+		self.close()
 		
-def encrypt(origin_file, end_file, offset):
-	"""Write the encrypted content of origin_file to end_file"""
+def encrypt(origin_file, end_file, offset, chunk_size = CHUNK_SIZE):
+	"""
+		Write the encrypted content of origin_file to end_file.
+		The file is processed chunk_size bytes at a time, so memory use does not depend on the size of the file.
+	"""
 	with open(origin_file, "r") as reader:
 		with CaesarWriter(end_file, offset) as writer:
-			for line in reader.readlines():
-				writer.write(line)
-def decrypt(origin_file, end_file):
-	"""Write the decrypted content of origin_file(must have been previously encrypted by this module) to end_file"""
-	with CaesarReader(origin_file) as reader:
+			while True:
+				chunk = reader.read(chunk_size)
+				if chunk == "":
+					break
+				writer.write(chunk)
+def decrypt(origin_file, end_file, chunk_size = CHUNK_SIZE):
+	"""
+		Write the decrypted content of origin_file(must have been previously encrypted by this module) to end_file.
+		The file is processed chunk_size bytes at a time, so memory use does not depend on the size of the file.
+	"""
+	with CaesarReader(origin_file, chunk_size) as reader:
 		with open(end_file, "w") as writer:
-			for line in reader.readlines():
-				writer.write(line)
+			while True:
+				chunk = reader.read(chunk_size)
+				if chunk == "":
+					break
+				writer.write(chunk)
+
+def _translate_mapped(source, source_start, destination, destination_start, size, table, chunk_size):
+	"""Translates size bytes of the source mmap into the destination mmap, chunk_size bytes at a time."""
+	for position in range(0, size, chunk_size):
+		end = min(position + chunk_size, size)
+		destination[destination_start+position:destination_start+end] = _translate(source[source_start+position:source_start+end], table)
+
+def encrypt_binary(origin_file, end_file, offset = None, chunk_size = CHUNK_SIZE):
+	"""
+		Write the encrypted content of origin_file to end_file, in the format of CaesarBinaryWriter.
+		Both files are memory-mapped: end_file is preallocated to its final size and filled chunk_size bytes at a time.
+		Returns the offset used.
+	"""
+	offset = _check_offset(offset)
+	with open(origin_file, "rb") as reader:
+		size = os.fstat(reader.fileno()).st_size
+		with open(end_file, "w+b") as writer:
+			writer.write(chr(offset))
+			if size == 0: #Empty files can't be mapped
+				return offset
+			writer.truncate(size + 1)
+			with closing(mmap.mmap(reader.fileno(), 0, access = mmap.ACCESS_READ)) as source:
+				with closing(mmap.mmap(writer.fileno(), size + 1)) as destination:
+					_translate_mapped(source, 0, destination, 1, size, _binary_encode_table(offset), chunk_size)
+	return offset
+
+def decrypt_binary(origin_file, end_file, chunk_size = CHUNK_SIZE):
+	"""
+		Write the decrypted content of origin_file(must have been previously encrypted by CaesarBinaryWriter or encrypt_binary) to end_file.
+		Both files are memory-mapped: end_file is preallocated to its final size and filled chunk_size bytes at a time.
+	"""
+	with open(origin_file, "rb") as reader:
+		offset = ord(reader.read(1))
+		size = os.fstat(reader.fileno()).st_size - 1
+		with open(end_file, "w+b") as writer:
+			if size == 0:
+				return
+			writer.truncate(size)
+			with closing(mmap.mmap(reader.fileno(), 0, access = mmap.ACCESS_READ)) as source:
+				with closing(mmap.mmap(writer.fileno(), size)) as destination:
+					_translate_mapped(source, 1, destination, 0, size, _binary_decode_table(offset), chunk_size)
+
+# **** Parallel processing ****
+# A shard is a (origin_file, end_file, start, stop, offset, decrypt, binary, position) tuple: bytes start to stop of origin_file
+# are converted and written at position in end_file. Shards are processed by module-level functions so they can be sent to a process pool.
+
+def _read_range(reader, start, stop, chunk_size):
+	"""Yields the bytes between start and stop of an opened file, chunk_size bytes at a time"""
+	reader.seek(start)
+	remaining = stop - start
+	while remaining > 0:
+		chunk = reader.read(min(chunk_size, remaining))
+		if chunk == "":
+			return
+		remaining -= len(chunk)
+		yield chunk
+
+def _pwrite(fd, data, position):
+	"""Writes all data at position in the file descriptor fd"""
+	while data:
+		if hasattr(os, "pwrite"):
+			written = os.pwrite(fd, data, position)
+		else: #Every process opens its own descriptor, so moving its position is safe
+			os.lseek(fd, position, os.SEEK_SET)
+			written = os.write(fd, data)
+		data = data[written:]
+		position += written
+
+def _shard_output_size(shard):
+	"""Returns how many bytes the converted shard will take in the end file"""
+	origin_file, end_file, start, stop, offset, decrypt, binary, position = shard
+	if binary:
+		return stop - start
+	if decrypt:
+		#Every character of the encrypted file gives one byte
+		deleted = _UTF8_CONTINUATION
+	else:
+		#Every converted byte >= 128 takes two bytes in utf-8
+		table = _encode_table(offset)
+		deleted = "".join(chr(b) for b in range(256) if ord(table[b]) >= 128)
+	size = 0
+	with open(origin_file, "rb") as reader:
+		for chunk in _read_range(reader, start, stop, CHUNK_SIZE):
+			if decrypt:
+				size += len(chunk.translate(None, deleted))
+			else:
+				size += 2*len(chunk) - len(chunk.translate(None, deleted))
+	return size
+
+def _convert_shard(shard):
+	"""Converts a shard of a file and writes it to its place in the end file"""
+	origin_file, end_file, start, stop, offset, decrypt, binary, position = shard
+	if binary:
+		table = _binary_decode_table(offset) if decrypt else _binary_encode_table(offset)
+	else:
+		table = _decode_table(offset) if decrypt else _encode_table(offset)
+		decoder = codecs.getincrementaldecoder("utf-8")()
+	fd = os.open(end_file, os.O_WRONLY)
+	try:
+		with open(origin_file, "rb") as reader:
+			for chunk in _read_range(reader, start, stop, CHUNK_SIZE):
+				if binary:
+					chunk = _translate(chunk, table)
+				elif decrypt:
+					chunk = _translate(decoder.decode(chunk).encode("latin-1"), table)
+				else:
+					chunk = _translate(chunk, table).decode("latin-1").encode("utf-8")
+				_pwrite(fd, chunk, position)
+				position += len(chunk)
+	finally:
+		os.close(fd)
+
+def _make_shards(origin_file, end_file, offset, decrypt, binary, shard_size):
+	"""
+		Writes the header of end_file and returns the shards needed to convert origin_file (without their position).
+		For the text format, shards of an encrypted file are moved so they never cut a utf-8 character.
+	"""
+	with open(origin_file, "rb") as reader:
+		size = os.fstat(reader.fileno()).st_size
+		if decrypt:
+			if binary:
+				offset = ord(reader.read(1))
+				start = 1
+			else:
+				first = reader.read(1)
+				if first >= "\x80":
+					first += reader.read(1)
+				offset = ord(first.decode("utf-8"))
+				start = len(first)
+		else:
+			offset = _check_offset(offset)
+			start = 0
+		boundaries = [start]
+		for boundary in range(start + shard_size, size, shard_size):
+			if decrypt and not binary:
+				reader.seek(boundary)
+				while boundary < size and reader.read(1) in _UTF8_CONTINUATION:
+					boundary += 1
+			if boundary > boundaries[-1]:
+				boundaries.append(boundary)
+		boundaries.append(size)
+	with open(end_file, "wb") as writer:
+		if not decrypt:
+			writer.write(chr(offset) if binary else unichr(offset).encode("utf-8"))
+	return [(origin_file, end_file, boundaries[i], boundaries[i+1], offset, decrypt, binary, None)
+		for i in range(len(boundaries) - 1) if boundaries[i] < boundaries[i+1]]
+
+def _parallel_convert(origin_files, end_files, offset, decrypt, binary, processes, shard_size):
+	if isinstance(origin_files, str):
+		origin_files = [origin_files]
+	if isinstance(end_files, str):
+		end_files = [end_files]
+	if len(origin_files) != len(end_files):
+		raise ValueError("There must be as many end files as origin files")
+	
+	shards = []
+	for origin_file, end_file in zip(origin_files, end_files):
+		shards.extend(_make_shards(origin_file, end_file, offset, decrypt, binary, shard_size))
+	
+	pool = multiprocessing.Pool(processes)
+	try:
+		sizes = pool.map(_shard_output_size, shards, 1)
+		#Every shard is written right after the previous shard of the same file
+		positions = {}
+		for end_file in end_files:
+			positions[end_file] = os.path.getsize(end_file) #Size of the header
+		for i, shard in enumerate(shards):
+			end_file = shard[1]
+			shards[i] = shard[:-1] + (positions[end_file],)
+			positions[end_file] += sizes[i]
+		for end_file, size in positions.items():
+			with open(end_file, "r+b") as writer:
+				writer.truncate(size) #Preallocate the file so every shard can be written at its position
+		pool.map(_convert_shard, shards, 1)
+	finally:
+		pool.close()
+		pool.join()
+
+def parallel_encrypt(origin_files, end_files, offset = None, processes = None, shard_size = SHARD_SIZE, binary = False):
+	"""
+		Encrypt one or many files using a pool of processes.
+		*origin_files, end_files (string or list of strings): the files to encrypt and the files that will be written.
+		*offset (int): the offset used for every file. If None, a random number is generated for each file.
+		*processes (int): the number of processes to use. If None, the number of cpus is used.
+		*shard_size (int): files bigger than this are split in shards of this size, each one encrypted by a different process.
+		*binary (bool): if True, files are written in the format of CaesarBinaryWriter, otherwise in the format of CaesarWriter.
+		
+		Output files are exactly the same as the ones written by encrypt() or encrypt_binary().
+	"""
+	_parallel_convert(origin_files, end_files, offset, False, binary, processes, shard_size)
+
+def parallel_decrypt(origin_files, end_files, processes = None, shard_size = SHARD_SIZE, binary = False):
+	"""
+		Decrypt one or many files using a pool of processes.
+		See parallel_encrypt for the arguments.
+	"""
+	_parallel_convert(origin_files, end_files, None, True, binary, processes, shard_size)
 
 #EXAMPLE
 		
@@ -187,6 +658,6 @@ if __name__ == "__main__":
 		out.write(" This is also the second line")
 		out.write("\nA third line because why not? And somê sp€ciàl ch@rs§")
 	with CaesarReader(name) as reader:
-		print "Content of the file when decrypted:"
+		print("Content of the file when decrypted:")
 		for line in reader.readlines():
-			print line
+			print(line)
@@ -29,8 +29,14 @@
 # prior written authorization from (the)Author.
 
 import sys
+import collections.abc
+import hashlib
 import json
 import os.path
+import stat
+import threading
+import time
+import types
 
 try:
 	import watchdog.observers, watchdog.events
@@ -38,6 +44,8 @@ except ImportError as e:
 	sys.stderr.write("****\nDependency watchdog not available! Did you run 'pip install -r requirements.txt'?\n****\n")
 	raise e
 
+MISSING = object()  # Value given to the callbacks of watch() for a path that doesn't exist in the config
+
 
 class ConfigWatchdog(watchdog.events.FileSystemEventHandler):
 	"""
@@ -48,21 +56,44 @@ class ConfigWatchdog(watchdog.events.FileSystemEventHandler):
 	This objects emulates all functions of container-type objects, so you can use it like a dict or list
 	(depending on how your config file is written). These calls will just be passed to the underlying `config` attribute.
 	You can set values for config, but beware that everything will be overridden when the file changes.
+	Only the first level can be set (`watchdog["db"] = {...}`): nested values are read-only.
+
+	The config is never modified in place: every reload (or value set) builds a new read-only snapshot and publishes it
+	by replacing a single reference. A reader that keeps the result of :func:`snapshot` sees a consistent config, without
+	any lock, even if the file is reloaded while it iterates over it.
+	Json objects are read-only mappings (:class:`types.MappingProxyType`) and json arrays are tuples, not dicts and lists:
+	they can't be given to :func:`json.dumps`, :mod:`pickle` or :func:`copy.deepcopy`, and an array is not equal to a list
+	(`watchdog["hosts"] == ["a", "b"]` is False). Use :func:`to_dict` to get a modifiable copy made of dicts and lists.
+
+	Components that only depend on a part of the config can be notified when this part changes, with :func:`watch`.
+
+	Programs often write a file in several steps (several writes, or a temporary file renamed), which causes several events.
+	The config is reloaded once, `debounce` seconds after the last of them.
+	All the objects share the same observer and the same thread for reloads, whatever the number of files watched.
+	It is only parsed again if the content of the file changed: a touch, a chmod or a rewrite with the same content is ignored.
 	"""
 
-	def __init__(self, configfilename: str, autostart = True, logger = None):
+	def __init__(self, configfilename: str, autostart = True, logger = None, debounce = 0.1):
 		"""
 		:param configfilename: The name of the config file to watch
 		:param autostart: Whether to start watching the file as soon as the object is constructed
 		:param logger: (optional) A logger to which we will log events. It can be any object with a .info(message) and
 			.error(message) methods.
+		:param debounce: Number of seconds without events to wait before reloading the config. Every event during this time
+			restarts the wait. 0 reloads the config on every event, in the thread of the observer.
 		"""
-		self.config = {}
+		self._current = (0, _freeze({}))  # (version, snapshot): replaced at once, so readers always see a matching pair
+		self._writeLock = threading.RLock()  # Serializes the snapshots published
+		self._subscriptions = {}  # Path (tuple of keys) -> list of (path given to watch, callback)
+		self.debounce = debounce
+		self.reloads = 0  # Number of times the config was loaded from the file
+		self.skippedReloads = 0  # Number of reloads not done because the content of the file didn't change
+		self.coalescedEvents = 0  # Number of events merged in the reload of another event
+		self._fileState = None  # (mtime_ns, size, inode) of the file when it was last read, None if it can't be trusted
+		self._fileHash = None  # Hash of the content of the file loaded in config
 		self._configFilename = os.path.abspath(configfilename)
 		self._logger = logger
-		self._observer = watchdog.observers.Observer()
-		self._observer.schedule(self, os.path.abspath(
-			os.path.dirname(configfilename)))  # We set ourselves as the event handler
+		self._started = False
 		if autostart:
 			self.start()
 
@@ -70,7 +101,10 @@ class ConfigWatchdog(watchdog.events.FileSystemEventHandler):
 		"""
 		Start watching the config file for changes
 		"""
-		self._observer.start()
+		if self._started:
+			return
+		self._started = True
+		_sharedObserver.add(self)
 		if self._logger is not None:
 			self._logger.info("Started watching for config changes")
 		# We load the initial config
@@ -80,45 +114,170 @@ class ConfigWatchdog(watchdog.events.FileSystemEventHandler):
 		"""
 		Stop watching for changes
 		"""
-		self._observer.stop()
+		if not self._started:
+			return
+		self._started = False
+		_sharedObserver.remove(self)
 		if self._logger is not None:
 			self._logger.info("Stopped watching for config changes")
 
+	def snapshot(self):
+		"""
+		:return: The current config, read-only at every level: json objects are read-only mappings, json arrays are tuples.
+			It never changes: a reload publishes a new snapshot.
+		"""
+		return self._current[1]
+
+	def to_dict(self):
+		"""
+		:return: A copy of the current config made of plain dicts and lists (a list if the file contains a json array),
+			that can be modified, serialized or compared like the result of :func:`json.load`.
+		"""
+		return _unfreeze(self._current[1])
+
+	@property
+	def version(self):
+		"""
+		Number of snapshots published since the object was created: it changes every time the config changes
+		"""
+		return self._current[0]
+
+	@property
+	def config(self):
+		return self._current[1]
+
+	@config.setter
+	def config(self, value):
+		self._publish(_freeze(value))
+
+	def watch(self, path, callback):
+		"""
+		Call a function every time a part of the config changes.
+
+		:param path: The keys leading to the part of the config, separated by dots: "db.pool_size", "servers.0.host"
+			(indexes of arrays are numbers). It can also be a tuple of keys, if a key contains a dot. "" is the whole config.
+		:param callback: Called with (path, old value, new value) after a new config is published, if the value at path changed.
+			The values are :data:`MISSING` if the path doesn't exist. It is called in the thread that reloaded the config,
+			while the config can't be changed by other threads: it must not wait for a thread that changes it.
+		"""
+		keys = _splitPath(path)
+		with self._writeLock:
+			self._subscriptions.setdefault(keys, []).append((path, callback))
+
+	def unwatch(self, path, callback):
+		"""
+		Stop calling a function given to :func:`watch`
+		"""
+		keys = _splitPath(path)
+		with self._writeLock:
+			self._subscriptions[keys].remove((path, callback))
+			if not self._subscriptions[keys]:
+				del self._subscriptions[keys]
+
+	def _publish(self, new):
+		"""
+		Make new (a read-only config built by _freeze) the current config, and call the callbacks of the paths that changed
+		"""
+		with self._writeLock:
+			old = self._current[1]
+			self._current = (self._current[0] + 1, new)
+			if not self._subscriptions:
+				return
+			subscriptions = [(keys, list(callbacks)) for keys, callbacks in self._subscriptions.items()]
+		changes = diff(old, new)
+		touched = set()  # Paths that changed, and the paths that contain them
+		for keys in changes:
+			for i in range(len(keys) + 1):
+				touched.add(keys[:i])
+		for keys, callbacks in subscriptions:
+			oldValue, newValue = _lookup(old, keys), _lookup(new, keys)
+			if keys not in touched:
+				# The path can still be in a part of the config that was added, removed or replaced by a value of another type
+				if not any(keys[:i] in changes for i in range(len(keys))) or not _differ(oldValue, newValue):
+					continue
+			for path, callback in callbacks:
+				try:
+					callback(path, oldValue, newValue)
+				except Exception as e:
+					if self._logger is not None:
+						self._logger.error("Error in the callback of config path %s: %s" % (path, e))
+
 	# **** Emulating a container type ****
 	def __getitem__(self, item):
-		return self.config[item]
+		return self._current[1][item]
 
 	def __contains__(self, item):
-		return self.config.__contains__(item)
+		return self._current[1].__contains__(item)
 
 	def __len__(self):
-		return self.config.__len__()
+		return self._current[1].__len__()
 
 	def __setitem__(self, key, value):
-		return self.config.__setitem__(key, value)
+		with self._writeLock:
+			data = _thaw(self._current[1])
+			data[key] = _freeze(value)
+			self._publish(_seal(data))
 
 	def __delitem__(self, key):
-		return self.config.__delitem__(key)
+		with self._writeLock:
+			data = _thaw(self._current[1])
+			del data[key]
+			self._publish(_seal(data))
 
 	def __iter__(self):
-		return self.config.__iter__()
+		return self._current[1].__iter__()
 
 	def __reversed__(self):
-		return self.config.__reversed__()
+		return self._current[1].__reversed__()
+
+	def _scheduleReload(self):
+		"""
+		Called for every event on the config file: reload it now, or after `debounce` seconds without other events
+		"""
+		if self.debounce > 0:
+			_sharedObserver.scheduleReload(self)
+		else:
+			self._reloadConfig()
 
 	def _reloadConfig(self):
-		if os.path.isfile(self._configFilename):
+		# start() reloads the config in its thread while the reload thread can already reload it: the file is read, compared
+		# and published by one thread at a time, so an older content can't replace a newer one
+		with self._writeLock:
 			try:
-				with open(self._configFilename, "r") as configFile:
-					self.config = json.load(configFile)
-			except (OSError, ValueError) as e:
-				# We do not modify the current config
+				fileStat = os.stat(self._configFilename)
+			except OSError:
+				fileStat = None
+			if fileStat is not None and stat.S_ISREG(fileStat.st_mode):
+				state = (fileStat.st_mtime_ns, fileStat.st_size, fileStat.st_ino)
+				if state == self._fileState:
+					self.skippedReloads += 1
+					return
+				try:
+					with open(self._configFilename, "rb") as configFile:
+						data = configFile.read()
+					readAt = time.time_ns()
+					digest = hashlib.blake2b(data, digest_size = 16).digest()
+					if digest != self._fileHash:
+						self._publish(_freeze(json.loads(data)))
+				except (OSError, ValueError) as e:
+					# We do not modify the current config
+					if self._logger is not None:
+						self._logger.error("Config loading aborted: error when loading config: %s " % e)
+					return
+				# The file can be written again in the same tick of the clock of the file system without changing its state:
+				# the state of a file modified less than a second before it was read is not used, the hash is compared instead
+				self._fileState = state if readAt - fileStat.st_mtime_ns > 1000000000 else None
+				if digest == self._fileHash:
+					self.skippedReloads += 1
+					return
+				self._fileHash = digest
+				self.reloads += 1
+			else:
+				self._fileState = None
+				self._fileHash = None
+				self._publish(_freeze({}))
 				if self._logger is not None:
-					self._logger.error("Config loading aborted: error when loading config: %s " % e)
-		else:
-			self.config.clear()
-			if self._logger is not None:
-				self._logger.info("Config file doesn't exist")
+					self._logger.info("Config file doesn't exist")
 
 	# ***** Overriding base class handlers *****
 	def on_created(self, event):
@@ -126,25 +285,219 @@ class ConfigWatchdog(watchdog.events.FileSystemEventHandler):
 			return
 		if self._logger is not None:
 			self._logger.info("Config file created")
-		self._reloadConfig()
+		self._scheduleReload()
 
 	def on_deleted(self, event):
 		if event.src_path != self._configFilename:
 			return
 		if self._logger is not None:
 			self._logger.info("Config file deleted. Emptying config")
-		self.config.clear()
+		self._scheduleReload()  # The file may be written again soon (some editors delete it before saving)
 
 	def on_modified(self, event):
 		if event.src_path != self._configFilename:
 			return
 		if self._logger is not None:
 			self._logger.info("Config file modified. Reloading config")
-		self._reloadConfig()
+		self._scheduleReload()
 
 	def on_moved(self, event):
 		# The config file can be either the source or the destination of the move
 		if (event.src_path == self._configFilename) or (event.dest_path == self._configFilename):
 			if self._logger is not None:
 				self._logger.info("Config file moved. Reloading config")
-			self._reloadConfig()
+			self._scheduleReload()
+
+
+def diff(old, new):
+	"""
+	Compare two configs loaded from json.
+
+	:return: A dict of the smallest parts that differ: tuple of keys -> (old value, new value).
+		Keys of arrays are their indexes, as strings. A value is :data:`MISSING` if the key doesn't exist in one of the configs.
+	"""
+	changes = {}
+	_diff(old, new, (), changes)
+	return changes
+
+
+def _diff(old, new, keys, changes):
+	if old is new:
+		return
+	if isinstance(old, collections.abc.Mapping) and isinstance(new, collections.abc.Mapping):
+		for key in old:
+			_diff(old[key], new.get(key, MISSING), keys + (key,), changes)
+		for key in new:
+			if key not in old:
+				changes[keys + (key,)] = (MISSING, new[key])
+	elif isinstance(old, (list, tuple)) and isinstance(new, (list, tuple)):
+		for i in range(max(len(old), len(new))):
+			_diff(old[i] if i < len(old) else MISSING, new[i] if i < len(new) else MISSING, keys + (str(i),), changes)
+	elif _differ(old, new):
+		changes[keys] = (old, new)
+
+
+def _differ(old, new):
+	# 1, 1.0 and true are equal in Python, but not in the config
+	return type(old) is not type(new) or old != new
+
+
+def _splitPath(path):
+	if isinstance(path, str):
+		return tuple(path.split(".")) if path else ()
+	return tuple(str(key) for key in path)
+
+
+def _lookup(data, keys):
+	"""
+	:return: The value at the path keys in data, or MISSING
+	"""
+	for key in keys:
+		try:
+			if isinstance(data, collections.abc.Mapping):
+				data = data[key]
+			elif isinstance(data, (list, tuple)):
+				data = data[int(key)]
+			else:
+				return MISSING
+		except (KeyError, IndexError, ValueError):
+			return MISSING
+	return data
+
+
+def _freeze(data):
+	"""
+	Read-only copy of a config: at every level, mappings become read-only mappings and lists become tuples.
+	Nothing refers to the new containers, so nobody can modify a snapshot, and snapshots can share the values that didn't change.
+	"""
+	if isinstance(data, collections.abc.Mapping):
+		return types.MappingProxyType({key: _freeze(value) for key, value in data.items()})
+	if isinstance(data, (list, tuple)):
+		return tuple(_freeze(value) for value in data)
+	return data
+
+
+def _unfreeze(data):
+	"""
+	Modifiable copy of a snapshot: at every level, read-only mappings become dicts and tuples become lists
+	"""
+	if isinstance(data, collections.abc.Mapping):
+		return {key: _unfreeze(value) for key, value in data.items()}
+	if isinstance(data, (list, tuple)):
+		return [_unfreeze(value) for value in data]
+	return data
+
+
+def _thaw(snapshot):
+	"""
+	Modifiable copy of the first level of a snapshot. The values are not copied: they are still read-only.
+	"""
+	if isinstance(snapshot, types.MappingProxyType):
+		return dict(snapshot)
+	if isinstance(snapshot, tuple):
+		return list(snapshot)
+	return snapshot
+
+
+def _seal(data):
+	"""
+	Snapshot of a value returned by _thaw, whose values are all read-only
+	"""
+	if isinstance(data, dict):
+		return types.MappingProxyType(data)
+	if isinstance(data, list):
+		return tuple(data)
+	return data
+
+
+class _SharedObserver(watchdog.events.FileSystemEventHandler):
+	"""
+	The observer and the reload thread of all the ConfigWatchdog objects.
+	Every directory is scheduled once, and every event is given to the watchers of its file with a dict lookup.
+	The threads are started with the first watcher and stopped with the last one.
+	"""
+
+	def __init__(self):
+		self._condition = threading.Condition()
+		self._observer = None
+		self._reloader = None
+		self._directories = {}  # Directory -> [ObservedWatch, number of watchers of files in it]
+		self._watchers = {}  # Absolute file name -> list of ConfigWatchdog
+		self._reloads = {}  # ConfigWatchdog -> time.monotonic() of its next reload
+
+	def add(self, watcher):
+		with self._condition:
+			if self._observer is None:
+				self._observer = watchdog.observers.Observer()
+				self._observer.start()
+				self._reloader = threading.Thread(target = self._runReloader, name = "ConfigWatchdog-reload", daemon = True)
+				self._reloader.start()
+			directory = os.path.dirname(watcher._configFilename)
+			if directory not in self._directories:
+				self._directories[directory] = [self._observer.schedule(self, directory), 0]  # We set ourselves as the event handler
+			self._directories[directory][1] += 1
+			self._watchers.setdefault(watcher._configFilename, []).append(watcher)
+
+	def remove(self, watcher):
+		observer = reloader = None
+		with self._condition:
+			self._reloads.pop(watcher, None)
+			watchers = self._watchers[watcher._configFilename]
+			watchers.remove(watcher)
+			if not watchers:
+				del self._watchers[watcher._configFilename]
+			directory = os.path.dirname(watcher._configFilename)
+			self._directories[directory][1] -= 1
+			if self._directories[directory][1] == 0:
+				self._observer.unschedule(self._directories.pop(directory)[0])
+			if not self._watchers:
+				observer, reloader = self._observer, self._reloader
+				self._observer = self._reloader = None
+				self._condition.notify()  # The reload thread stops when it is no longer self._reloader
+		if observer is not None:
+			observer.stop()
+			for thread in (observer, reloader):
+				if thread is not threading.current_thread():
+					thread.join()
+
+	def scheduleReload(self, watcher):
+		"""
+		Reload the config of watcher after `debounce` seconds without other events
+		"""
+		with self._condition:
+			if watcher in self._reloads:
+				watcher.coalescedEvents += 1
+			self._reloads[watcher] = time.monotonic() + watcher.debounce
+			self._condition.notify()
+
+	def _runReloader(self):
+		"""
+		Main function of the thread that reloads the configs when their time comes
+		"""
+		thread = threading.current_thread()
+		while True:
+			with self._condition:
+				while self._reloader is thread:
+					now = time.monotonic()
+					due = [watcher for watcher, reloadAt in self._reloads.items() if reloadAt <= now]
+					if due:
+						break
+					self._condition.wait(min(self._reloads.values()) - now if self._reloads else None)
+				if self._reloader is not thread:
+					return
+				for watcher in due:
+					del self._reloads[watcher]
+			for watcher in due:
+				watcher._reloadConfig()
+
+	def dispatch(self, event):
+		paths = [event.src_path]
+		if getattr(event, "dest_path", None):
+			paths.append(event.dest_path)
+		with self._condition:
+			watchers = [watcher for path in paths for watcher in self._watchers.get(path, ())]
+		for watcher in dict.fromkeys(watchers):  # A file moved over itself is given once
+			watcher.dispatch(event)
+
+
+_sharedObserver = _SharedObserver()
@@ -5,6 +5,8 @@
 	This filter block everything that has a priority higher than the priority passed to its constructor.
 	If you want for example to redirect INFO and DEBUG to stdout and WARNING and higher to stderr, this is the
 	module you're looking for!
+	It also defines RateLimitFilter, which stops a message repeated in a loop from flooding the output,
+	and LevelRouter, a handler that sends every record to the handlers of its level without any filter.
 	
 	This module is distributed under the MIT License
 	
@@ -32,7 +34,19 @@
 	otherwise to promote the sale, use or other dealings in this Software without 
 	prior written authorization from (the )Author.
 """
+import collections
+import copy
 import logging
+import sys
+import threading
+import time
+
+try:
+	basestring
+except NameError: #Python 3
+	basestring = str
+
+_clock = getattr(time, "monotonic", time.time) #time.monotonic doesn't exist in Python 2
 
 class MaxLevelFilter():
 	"""
@@ -48,11 +62,251 @@ class MaxLevelFilter():
 			:return: True if the event should be logged, False otherwise
 		"""
 		return record.levelno < self.Level
+
+class RateLimitFilter():
+	"""
+		Limits how often similar messages are logged. Messages are similar if they come from the same logger, with the same level
+		and the same message before its arguments are merged: "%s failed" % "a" and "%s failed" % "b" are similar.
+		Every kind of message has a token bucket: on average `rate` messages per second are logged, with bursts of `burst` messages.
+		The others are suppressed, and the next message of the same kind that is logged ends with "(suppressed N similar messages)".
+		While a message is repeated, this summary is logged about every 1/rate seconds.
+
+		Add the filter to a handler with :func:`attach`: the summary is added to the text written by this handler only.
+		A record is shared by all the handlers of a logger, so the filter never modifies it. When a flood stops, or when its kind
+		of message is forgotten (see `maxKeys`), the last message suppressed is written with the summary, so no count is lost:
+		this is done by the next record the filter sees, so it can be late when nothing else is logged.
+		With `handler.addFilter` the summary is only shown on Python 3.12 and later, where a filter can give a copy of the record
+		to its handler, and only with the next message of the same kind: the count of a flood that stops is lost.
+
+		Only the `maxKeys` kinds of messages seen most recently are remembered, so memory stays bounded when there are many different messages.
+		Use a different object for every handler or logger: the buckets are shared by everything the object filters.
+	"""
+	def __init__(self, rate = 1.0, burst = 10, maxKeys = 1000):
+		"""
+		:param rate: Number of messages of a kind logged per second, on average.
+		:param burst: Number of messages of a kind that can be logged at once, after a quiet period.
+		:param maxKeys: Number of kinds of messages remembered. When a new kind arrives, the least recently seen one is forgotten.
+		"""
+		self.rate = rate
+		self.burst = burst
+		self.maxKeys = maxKeys
+		self.suppressed = 0 #Total number of messages suppressed
+		self._buckets = collections.OrderedDict() #Key -> [tokens, time of the last update, messages suppressed since the last one logged, last record suppressed]
+		self._pending = collections.OrderedDict() #Key -> bucket, of the buckets with messages suppressed, the least recently updated first. Only with attach.
+		self._lock = threading.Lock()
+		self._handler = None
+		self._local = threading.local() #summary: (record, number of messages suppressed) of the record being handled by this thread
+
+	def attach(self, handler):
+		"""
+			Add the filter to a handler, and make the handler add the summaries to the text of the records it outputs.
+		"""
+		self._handler = handler
+		handler.addFilter(self)
+		format = handler.format
+		local = self._local
+		def formatWithSummary(record):
+			summary = getattr(local, "summary", None)
+			if summary == None or summary[0] is not record:
+				return format(record)
+			local.summary = None
+			#The message is changed while this handler formats the record only
+			msg, args = record.msg, record.args
+			record.msg = record.getMessage() + " (suppressed %d similar messages)" % summary[1]
+			record.args = ()
+			try:
+				return format(record)
+			finally:
+				record.msg, record.args = msg, args
+		handler.format = formatWithSummary
+
+	def filter(self, record):
+		"""
+			Process the event.
+			:return: True if the event should be logged, False otherwise
+		"""
+		if getattr(record, "_rateLimitSummary", None) is self: #A summary sent by this filter: see _sendSummaries
+			return True
+		if isinstance(record.msg, basestring):
+			key = (record.name, record.levelno, record.msg)
+		else: #The message is an object: the place of the call identifies the kind of message
+			key = (record.name, record.levelno, record.pathname, record.lineno)
+		now = _clock()
+		late = [] #(last record suppressed, number of messages suppressed) of the floods that stopped
+		with self._lock:
+			pending = self._pending
+			bucket = self._buckets.pop(key, None)
+			if bucket == None:
+				bucket = [self.burst, now, 0, None]
+				if len(self._buckets) >= self.maxKeys:
+					oldKey, oldBucket = self._buckets.popitem(last = False)
+					if pending.pop(oldKey, None) != None:
+						late.append((oldBucket[3], oldBucket[2]))
+			else:
+				bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+				bucket[1] = now
+				pending.pop(key, None)
+			self._buckets[key] = bucket #Moved (or added) to the end: the most recently seen
+			if bucket[0] < 1:
+				bucket[2] += 1
+				self.suppressed += 1
+				if self._handler != None:
+					bucket[3] = record
+					pending[key] = bucket
+				suppressed = 0
+				rv = False
+			else:
+				bucket[0] -= 1
+				suppressed = bucket[2]
+				bucket[2] = 0
+				bucket[3] = None
+				rv = True
+			#The floods that had no message during the time to get a token again have stopped
+			while pending:
+				oldKey, oldBucket = next(iter(pending.items()))
+				if now - oldBucket[1] < 1.0 / self.rate:
+					break
+				del pending[oldKey]
+				late.append((oldBucket[3], oldBucket[2]))
+				oldBucket[2] = 0
+				oldBucket[3] = None
+		if late:
+			self._sendSummaries(late)
+		if suppressed:
+			if self._handler != None:
+				self._local.summary = (record, suppressed) #Used by the format method of the handler, just after this call
+			elif sys.version_info >= (3, 12):
+				#A filter can return a new record: other handlers of the same record don't get the summary
+				record = copy.copy(record)
+				record.msg = record.getMessage() + " (suppressed %d similar messages)" % suppressed
+				record.args = ()
+				return record
+		return rv
+
+	def _sendSummaries(self, late):
+		"""Write the last message suppressed of floods that stopped, with their summary, to the handler of the filter"""
+		for record, suppressed in late:
+			summary = copy.copy(record)
+			summary.msg = record.getMessage() + " (suppressed %d similar messages)" % suppressed
+			summary.args = ()
+			summary.exc_info = summary.exc_text = None
+			summary._rateLimitSummary = self
+			self._handler.handle(summary)
+
+class LevelRouter(logging.Handler):
+	"""
+		A handler that sends every record to the handlers of its level band. It replaces a MaxLevelFilter and a minimum level on every handler:
+		the handlers of every level are computed once, so a record is not tested by the filters of every handler.
+		Handlers that share a formatter get the same text: a record is formatted once per formatter.
+
+		Add the router to the logger, not the handlers it routes to::
+
+			LOGGER.addHandler(LevelRouter({
+				(logging.DEBUG, logging.WARNING): [stdout_hdlr],
+				(logging.WARNING, None): [stderr_hdlr, mail_hdlr],
+				(None, None): [file_hdlr],
+			}))
+	"""
+	def __init__(self, routes):
+		"""
+		:param routes: A dict, or a list of pairs, of (minLevel, maxLevel) -> list of handlers.
+			minLevel is inclusive and maxLevel is exclusive, like MaxLevelFilter. None means no limit.
+			A handler in several bands gets a record once. Levels and filters of the handlers still apply.
+			Formatters of the handlers are replaced by formatters sharing their text: set them before creating the router.
+		"""
+		logging.Handler.__init__(self)
+		if hasattr(routes, "items"):
+			routes = list(routes.items())
+		bounds = [bound for band, handlers in routes for bound in band if bound != None]
+		formatters = {} #Formatter -> the _SharedFormatter that replaces it
+		table = []
+		for level in range(max(bounds + [logging.CRITICAL]) + 1): #Levels above the highest bound have the handlers of the last level
+			levelHandlers = []
+			for (minLevel, maxLevel), handlers in routes:
+				if (minLevel == None or level >= minLevel) and (maxLevel == None or level < maxLevel):
+					for handler in handlers:
+						if handler not in levelHandlers:
+							levelHandlers.append(handler)
+			table.append(tuple(levelHandlers))
+		for (minLevel, maxLevel), handlers in routes:
+			for handler in handlers:
+				if not isinstance(handler.formatter, _SharedFormatter):
+					formatter = handler.formatter or logging.Formatter()
+					if formatter not in formatters:
+						formatters[formatter] = _SharedFormatter(formatter)
+					handler.setFormatter(formatters[formatter])
+		self._table = table
+
+	def handle(self, record):
+		#The handlers have their own locks: the router doesn't need one
+		rv = self.filter(record)
+		if isinstance(rv, logging.LogRecord): #Python 3.12+: a filter can return a new record
+			record = rv
+		if rv:
+			self.emit(record)
+		return rv
+
+	def emit(self, record):
+		level = record.levelno
+		handlers = self._table[min(max(level, 0), len(self._table) - 1)]
+		if not handlers:
+			return
+		owner = not hasattr(record, "_sharedFormats") #False if this router was called by another one
+		if owner:
+			record._sharedFormats = {}
+		try:
+			for handler in handlers:
+				if level >= handler.level:
+					handler.handle(record)
+		finally:
+			if owner:
+				del record._sharedFormats
+
+	def flush(self):
+		for handlers in self._table:
+			for handler in handlers:
+				handler.flush()
+
+class _SharedFormatter(logging.Formatter):
+	"""
+		Formatter of the handlers of a LevelRouter: the text of a record is kept while the router sends it to its handlers,
+		so handlers with the same formatter don't format it again. Everything else is done by the formatter it replaces.
+	"""
+	def __init__(self, formatter):
+		#logging.Formatter.__init__ is not called: the attributes of a formatter are the ones of the formatter it replaces
+		self.formatter = formatter
+
+	def __getattr__(self, name):
+		return getattr(self.__dict__["formatter"], name)
+
+	def format(self, record):
+		formats = getattr(record, "_sharedFormats", None)
+		if formats == None: #The record doesn't come from a LevelRouter
+			return self.formatter.format(record)
+		#The message is compared too: a filter of a handler can change it (RateLimitFilter summary, copy of the record on Python 3.12+)
+		shared = formats.get(self)
+		if shared == None or shared[0] is not record.msg:
+			shared = (record.msg, self.formatter.format(record))
+			formats[self] = shared
+		return shared[1]
+
+	def formatTime(self, record, datefmt = None):
+		return self.formatter.formatTime(record, datefmt)
+
+	def formatException(self, ei):
+		return self.formatter.formatException(ei)
+
+	def formatStack(self, stack_info):
+		return self.formatter.formatStack(stack_info)
+
+	def formatMessage(self, record):
+		return self.formatter.formatMessage(record)
+
+	def usesTime(self):
+		return self.formatter.usesTime()
 	
 #EXAMPLE: We want to log every INFO and DEBUG message to stdout and other messages to stderr
 if __name__ == "__main__":
-	import sys
-	
 	LOGGER = logging.getLogger(__name__)
 	LOGGER.setLevel(logging.DEBUG) #We will log every message
 	stdout_hdlr = logging.StreamHandler(sys.stdout)
@@ -65,4 +319,17 @@ if __name__ == "__main__":
 	#Now, some messages
 	LOGGER.debug("This is a DEBUG message and will go to stdout")
 	LOGGER.error("This is an ERROR message and will go to stderr")
-	LOGGER.warning("This is a WARNING message and will also go to stderr")
\ No newline at end of file
+	LOGGER.warning("This is a WARNING message and will also go to stderr")
+	
+	#The same thing with a LevelRouter
+	LOGGER.removeHandler(stdout_hdlr)
+	LOGGER.removeHandler(stderr_hdlr)
+	LOGGER.addHandler(LevelRouter({(None, logging.WARNING): [logging.StreamHandler(sys.stdout)], (logging.WARNING, None): [stderr_hdlr]}))
+	LOGGER.info("This is an INFO message routed to stdout")
+	LOGGER.warning("This is a WARNING message routed to stderr")
+	
+	#A message repeated in a loop: only the first 3 go to stderr, then one every 0.1 second with the number of messages suppressed
+	RateLimitFilter(rate = 10, burst = 3).attach(stderr_hdlr)
+	end = time.time() + 0.3
+	while time.time() < end:
+		LOGGER.error("Connection to %s failed", "server")
\ No newline at end of file
@@ -28,9 +28,28 @@
 # Except as contained in this notice, the name(s) of (the) Author shall not be used in advertising or
 # otherwise to promote the sale, use or other dealings in this Software without
 # prior written authorization from (the)Author.
+import atexit
+import collections.abc
+import datetime
+import glob
+import gzip
+import json
 import logging
 import logging.handlers
+import multiprocessing
+import operator
+import os
+import queue
+import shutil
 import sys
+import threading
+import time
+import weakref
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None # Only needed for file_compression = "zstd"
 
 # HANDLER CONSTANTS
 # This constants are used to define which handler are enabled for a specific logger.
@@ -41,18 +60,53 @@ HANDLER_STDERR = 2
 HANDLER_FILE = 4
 HANDLER_ALL = 7
 
+# Levels of the logging module, by name
+_LEVELS = {
+	"debug": logging.DEBUG,
+	"info": logging.INFO,
+	"warning": logging.WARNING,
+	"error": logging.ERROR,
+	"critical": logging.CRITICAL,
+}
+
+# Every Logger by name: creating a Logger with the same name returns the existing object
+_instances = {}
+# Handlers of the files written by the loggers of this process, by absolute file name: [handler, number of loggers using it]
+_fileHandlers = {}
+_instancesLock = threading.RLock()
+
+def _noop(*args, **kwargs):
+	"""Shorthand method of a disabled level"""
+	pass
+
 class Logger():
 	"""
 		Objects of this class are used for logging.
 		You should create one for every module for which you wish to have logging.
+
+		The shorthand methods (:func:`debug`, :func:`info`...) are bound when the object is created and by :func:`setLevel`:
+		methods of disabled levels do nothing, the others directly call the method of the :mod:`logging` logger.
+		If the level is changed with the :mod:`logging` module instead (`Logger.setLevel` of the :mod:`logging` logger,
+		:func:`logging.disable`, :mod:`logging.config`), call :func:`rebind`: until then, the levels that were disabled stay disabled.
+
+		There is only one object for every name: creating a Logger with the name of an existing one returns the existing object.
+		If the arguments are different, its handlers are replaced by the ones of the new arguments.
+		Loggers with the same `file_name` share the handler of the file, so it is opened once and every record is written once.
 	"""
+	def __new__(cls, name, *args, **options):
+		with _instancesLock:
+			instance = _instances.get(name)
+			if instance == None:
+				instance = object.__new__(cls)
+			return instance
+
 	def __init__(self, name, level = "info", handlers_enabled = HANDLER_STDOUT|HANDLER_STDERR, **options):
 		"""
 		A logger capable to output its messages to different handlers.
 
 		:param name: The name of the logger as required for the :mod:`logging` module.
 			Normally you can use `__name__` as it will be the name of the module that creates the logger.
-			It is not possible to create two logger with the same :attr:`name` attribute
+			If a logger with this name already exists, it is returned (and configured again if the other arguments are different)
 		:param level: Minimum level of the logger. Valid values are "debug", "info", "warning", "error", "critical".
 		:param handlers_enabled: handlers that will be enabled for logging. This is a combination of flags constants defined in the module namespace.
 			This is intended so when you want to enable/disable a handler you just need to remove a flag: you don't need to modofy the `options`
@@ -61,76 +115,191 @@ class Logger():
 
 			- HANDLER_STDOUT
 			- HANDLER_STDERR
-			- HANDLER_FILE : a WatchedFileHandler or RotatingFileHandler
+			- HANDLER_FILE : a WatchedFileHandler, RotatingFileHandler or rotating file handler with background compression.
+				With the `file_writer` option, records are sent to a :class:`FileWriterProcess` instead.
 		:param **options: Options for all the handlers. If an option is missing, default value will be used.
 			For a list of options and defaults values look at the source code (beginning of :func:`__init__` function)
 		"""
 		default_options = {
 			# Valid values for levels are: "debug", "info", "warning", "error", "critical", None(no limit)
 			# Minimum levels are inclusive, maximum level are exclusive (that means that a maximum level of 'warning' will only log messages up to 'info')
-			# Formats: see logging module documentation
+			# Formats: see logging module documentation. "json" writes every record as a JSON object on one line, with the fields of json_fields
 			"stdout_minLevel": "debug",
 			"stdout_maxLevel": "warning",
 			"stdout_format": "=> %(asctime)s ["+name+"][%(levelname)s] %(message)s", #Add %(threadName)s for the name of the tread that logged the message
 			"stdout_dateformat": "%Y-%m-%d(%a) %H:%M:%S", # Only useful if %(asctime)s is present in the log format
+			"stdout_filters": [], # Other filters of the handler, for example a MaxLevelFilter.RateLimitFilter. Give a different object to every handler. Filters with an attach(handler) method are attached with it.
 			"stderr_minLevel": "warning",
 			"stderr_maxLevel": None,
 			"stderr_format": "=> %(asctime)s ["+name+"][%(levelname)s] %(message)s",
 			"stderr_dateformat": "%Y-%m-%d(%a) %H:%M:%S",
-			"file_name": name+".log",
+			"stderr_filters": [],
+			"file_name": name+".log", # Loggers with the same file_name share the file: the other file_ options are the ones of the first logger, except file_minLevel, file_maxLevel, file_format and file_dateformat.
 			"file_mode": "a", # Opening mode for the file
 			"file_encoding": "utf-8",
 			"file_delay": True, #If true, file opening is deferred until the first message is logged
 			"file_rotating": True, #If true, a RotatingFileHandler is used: when the file reach a certain size a new one will be created and the old one will be renamed to a backup name
 			"file_maxBytes": 5*1000, # When the file exceeds this size the log will rotate. Ignored if file_rotating is False.
 			"file_backupCount": 3, # How many backup log keep at every time. Ignored if file_rotating is False.
+			"file_rotateMode": "rename", # "rename": backups are renamed at every rotation (log.1 -> log.2...). "background": the file is renamed once with a timestamp, and backups are compressed and deleted by a background thread. Ignored if file_rotating is False.
+			"file_rotateInterval": None, # In background mode, the log also rotates after this number of seconds. None: only rotate on size.
+			"file_compression": "gzip", # In background mode, how backups are compressed: None, "gzip" or "zstd" (needs the zstandard package).
+			"file_buffered": False, # If true, records are kept in memory and written to the file together, when one of the following limits is reached
+			"file_bufferBytes": 64*1024, # Size of the records in the buffer (in characters). Ignored if file_buffered is False.
+			"file_bufferRecords": 1000, # Number of records in the buffer. Ignored if file_buffered is False.
+			"file_bufferMillis": 1000, # Age of the oldest record in the buffer. The buffer is also written every file_bufferMillis by a background thread. None: no limit on time. Ignored if file_buffered is False.
+			"file_flushLevel": "error", # Records of this level or higher are written immediately, with the buffer. Ignored if file_buffered is False.
+			"file_writer": None, # A FileWriterProcess. If set, records are sent to this process, which writes them to its file: all the file_ options except file_minLevel and file_maxLevel are ignored.
 			"file_minLevel": "debug",
 			"file_maxLevel": None,
 			"file_format": "=> %(asctime)s ["+name+"][%(levelname)s] %(message)s",
 			"file_dateformat": "%Y-%m-%d(%a) %H:%M:%S",
+			"file_filters": [],
+			"message_style": "%", # How arguments are merged in messages: "%" for "value: %s", "{" for "value: {}"
+			"json_fields": ["time", "name", "level", "message"], # Fields of the "json" format. Valid values are the keys of _JSON_FIELDS. The exception and stack trace are added when present.
+			"async_enabled": False, # If true, handlers run on a background thread: logging calls only put the record in a queue
+			"async_queueSize": 10000, # Maximum number of records waiting in the queue. 0 means no limit. Ignored if async_enabled is False.
+			"async_whenFull": "block", # When the queue is full, "block" waits for a free place, "drop" discards the record. Ignored if async_enabled is False.
+			"stats_enabled": False, # If true, records, bytes and time spent are counted for every level and handler: see stats()
 		}
 
 		default_options.update(options)
 		options = default_options
+		config = (level, handlers_enabled, options)
+		with _instancesLock:
+			if getattr(self, "_config", None) == config:
+				return # Created again with the same arguments: the existing handlers are kept
+			if hasattr(self, "_config"):
+				self._detach()
+			self._config = config
+			self._configure(name, level, handlers_enabled, options)
+			_instances[name] = self
+
+	def _configure(self, name, level, handlers_enabled, options):
+		"""Create the handlers of the object and add them to the :mod:`logging` logger"""
 		self.Logger = logging.getLogger(name)
 		self.Logger.setLevel(self.level_from_string(level))
+		self._listener = None
+		self._handlers = [] # Handlers that output the records, even when they run on the thread of a _QueueListener
+		self._attached = [] # Handlers added to the logging logger
+		self._levelCounter = None
+		self._handlerStats = {}
+		self._bindLevelMethods()
+		handlers = self._handlers
+		self.Logger.makeRecord = _messageRecordMaker(self.Logger, options["message_style"] == "{")
+		if options["stats_enabled"]:
+			self._levelCounter = _LevelCounter()
+			self.Logger.addFilter(self._levelCounter)
+
+		def add(handlerName, handler):
+			for f in options[handlerName + "_filters"]:
+				if hasattr(f, "attach"):
+					f.attach(handler)
+				else:
+					handler.addFilter(f)
+			if options["stats_enabled"]:
+				self._handlerStats[handlerName] = _HandlerStats(handler)
+			handlers.append(handler)
+
+		formatters = {} # Handlers with the same format share their formatter, so a record is formatted once for all of them
+		def formatter(prefix):
+			key = (options[prefix + "_format"], options[prefix + "_dateformat"])
+			if key not in formatters:
+				if key[0] == "json":
+					formatters[key] = _JsonFormatter(options["json_fields"], key[1])
+				else:
+					formatters[key] = _Formatter(key[0], datefmt = key[1])
+			return formatters[key]
 
 		if (handlers_enabled & HANDLER_STDOUT):
 			handler = logging.StreamHandler(sys.stdout)
-			handler.setFormatter(logging.Formatter(options["stdout_format"], datefmt =options["stdout_dateformat"]))
+			handler.setFormatter(formatter("stdout"))
 			if options["stdout_minLevel"] != None:
 				handler.setLevel(self.level_from_string(options["stdout_minLevel"]))
 			if options["stdout_maxLevel"] != None:
 				handler.addFilter(_MaxLevelFilter(self.level_from_string(options["stdout_maxLevel"])))
-			self.Logger.addHandler(handler)
+			add("stdout", handler)
 		if (handlers_enabled & HANDLER_STDERR):
 			handler = logging.StreamHandler(sys.stderr)
-			handler.setFormatter(logging.Formatter(options["stderr_format"], datefmt =options["stderr_dateformat"]))
+			handler.setFormatter(formatter("stderr"))
 			if options["stderr_minLevel"] != None:
 				handler.setLevel(self.level_from_string(options["stderr_minLevel"]))
 			if options["stderr_maxLevel"] != None:
 				handler.addFilter(_MaxLevelFilter(self.level_from_string(options["stderr_maxLevel"])))
-			self.Logger.addHandler(handler)
-		if (handlers_enabled & HANDLER_FILE):
+			add("stderr", handler)
+		if (handlers_enabled & HANDLER_FILE) and options["file_writer"] != None:
+			# Records are formatted by the writer process: here the message is only merged with its arguments so the record can be pickled
+			handler = _ProcessQueueHandler(options["file_writer"].queue)
+			handler.setFormatter(_Formatter())
+			if options["file_minLevel"] != None:
+				handler.setLevel(self.level_from_string(options["file_minLevel"]))
+			if options["file_maxLevel"] != None:
+				handler.addFilter(_MaxLevelFilter(self.level_from_string(options["file_maxLevel"])))
+			add("file", handler)
+		elif (handlers_enabled & HANDLER_FILE):
 			kwargs = {
 				"mode": options["file_mode"],
 				"encoding": options["file_encoding"],
 				"delay": options["file_delay"],
 			}
-			if options["file_rotating"]:
+			if options["file_rotating"] and options["file_rotateMode"] == "background":
 				kwargs["maxBytes"] = options["file_maxBytes"]
 				kwargs["backupCount"] = options["file_backupCount"]
-				handler = logging.handlers.RotatingFileHandler(options["file_name"], **kwargs)
+				kwargs["interval"] = options["file_rotateInterval"]
+				kwargs["compression"] = options["file_compression"]
+				handlerClass = _BufferedBackgroundRotatingFileHandler if options["file_buffered"] else _BackgroundRotatingFileHandler
+			elif options["file_rotating"]:
+				kwargs["maxBytes"] = options["file_maxBytes"]
+				kwargs["backupCount"] = options["file_backupCount"]
+				handlerClass = _BufferedRotatingFileHandler if options["file_buffered"] else logging.handlers.RotatingFileHandler
 			else:
-				handler = logging.handlers.WatchedFileHandler(options["file_name"], **kwargs)
-
-			handler.setFormatter(logging.Formatter(options["file_format"], datefmt = options["file_dateformat"]))
+				handlerClass = _BufferedWatchedFileHandler if options["file_buffered"] else logging.handlers.WatchedFileHandler
+			if options["file_buffered"]:
+				kwargs["bufferBytes"] = options["file_bufferBytes"]
+				kwargs["bufferRecords"] = options["file_bufferRecords"]
+				kwargs["bufferMillis"] = options["file_bufferMillis"]
+				kwargs["flushLevel"] = self.level_from_string(options["file_flushLevel"])
+			handler = _SharedFileHandler(os.path.abspath(options["file_name"]), lambda: handlerClass(options["file_name"], **kwargs))
+			handler.setFormatter(formatter("file"))
 			if options["file_minLevel"] != None:
 				handler.setLevel(self.level_from_string(options["file_minLevel"]))
 			if options["file_maxLevel"] != None:
 				handler.addFilter(_MaxLevelFilter(self.level_from_string(options["file_maxLevel"])))
+			add("file", handler)
+
+		if options["async_enabled"]:
+			if options["async_whenFull"] not in ("block", "drop"):
+				raise ValueError("async_whenFull must be 'block' or 'drop'")
+			records = queue.Queue(options["async_queueSize"])
+			self._listener = _QueueListener(records, *handlers, respect_handler_level = True)
+			self._listener.start()
+			atexit.register(self.close) # Records still in the queue are handled before the program exits
+			self._attached.append(_QueueHandler(records, options["async_whenFull"] == "drop"))
+		else:
+			self._attached.extend(handlers)
+		for handler in self._attached:
 			self.Logger.addHandler(handler)
 
+	def _detach(self):
+		"""Remove the handlers of the object from the :mod:`logging` logger and close them"""
+		self.close()
+		del self.Logger.makeRecord
+		if self._levelCounter != None:
+			self.Logger.removeFilter(self._levelCounter)
+		for handler in self._attached:
+			self.Logger.removeHandler(handler)
+		for handler in self._handlers:
+			handler.close()
+
+	def close(self):
+		"""
+			Stop the background thread used when `async_enabled` is True, after all the records in the queue are handled.
+			Called automatically when the program exits.
+		"""
+		if self._listener != None:
+			self._listener.stop()
+			self._listener = None
+
 	@staticmethod
 	def level_from_string(s):
 		"""
@@ -138,26 +307,97 @@ class Logger():
 
 		Accepted values are "debug", "info", "warning", "error", "critical".
 		"""
-		if s == "debug" :
-			return logging.DEBUG
-		elif s == "info":
-			return logging.INFO
-		elif s == "warning":
-			return logging.WARNING
-		elif s == "error":
-			return logging.ERROR
-		elif s == "critical":
-			return logging.CRITICAL
-		else:
-			return logging.NOTSET
+		return _LEVELS.get(s, logging.NOTSET)
 
+	def enabled(self, level):
+		"""
+			Tell if a message of this level would be output by a handler.
+			Use it to avoid building an expensive message that would be discarded::
+
+				if logger.enabled("debug"):
+					logger.debug("state: " + dump(state))
+
+			:param level: Valid values are "debug", "info", "warning", "error", "critical".
+		"""
+		levelno = self.level_from_string(level)
+		if not self.Logger.isEnabledFor(levelno):
+			return False
+		# Same search as logging.Logger.callHandlers
+		logger = self.Logger
+		found = False
+		while logger != None:
+			handlers = self._handlers if logger is self.Logger else logger.handlers
+			for handler in handlers:
+				found = True
+				if levelno >= handler.level and all(f.Level > levelno for f in handler.filters if isinstance(f, _MaxLevelFilter)):
+					return True
+			if not logger.propagate:
+				break
+			logger = logger.parent
+		if not found and logging.lastResort != None:
+			return levelno >= logging.lastResort.level
+		return False
+
+	def stats(self):
+		"""
+			Return the counters of the object since it was configured, or None if the `stats_enabled` option is False::
+
+				{
+					"levels": {"info": 1200, "error": 3}, # Records logged by this logger, by level
+					"handlers": {
+						"file": {
+							"records": 1203, # Records output by the handler
+							"dropped": 0, # Records rejected by the filters of the handler (maximum level and the _filters option)
+							"bytes": 96240, # Size of the formatted records, in the encoding of the handler
+							"format_seconds": 0.012,
+							"emit_seconds": 0.031, # Formatting included
+						},
+					},
+					"async_dropped": 0, # Records discarded because the queue was full (async_whenFull = "drop")
+				}
+
+			Records under the minimum level of a handler never reach it, so they are not counted as dropped.
+		"""
+		if self._levelCounter == None:
+			return None
+		with _instancesLock:
+			return {
+				"levels": self._levelCounter.snapshot(),
+				"handlers": {name: handlerStats.snapshot() for name, handlerStats in self._handlerStats.items()},
+				"async_dropped": sum(handler.dropped for handler in self._attached if isinstance(handler, _QueueHandler)),
+			}
+
+	def setLevel(self, level):
+		"""
+			Change the minimum level of the logger.
+
+			:param level: Valid values are "debug", "info", "warning", "error", "critical".
+		"""
+		with _instancesLock:
+			self.Logger.setLevel(self.level_from_string(level))
+			self._bindLevelMethods()
+
+	def _bindLevelMethods(self):
+		"""
+			Replace the shorthand methods of this object by the methods of the :mod:`logging` logger for enabled levels,
+			and by a function that does nothing for disabled levels.
+		"""
+		# Same test as logging.Logger.isEnabledFor, except the disabled attribute: it is checked by the methods of the logging logger
+		effectiveLevel = self.Logger.getEffectiveLevel()
+		disabledLevel = self.Logger.manager.disable
+		for name, level in _LEVELS.items():
+			if level > disabledLevel and level >= effectiveLevel:
+				setattr(self, name, getattr(self.Logger, name))
+			else:
+				setattr(self, name, _noop)
 
 	def log(self, level, message, *args, **kwargs):
 		"""
 			Log a message.
 
 			:param level: The message level. Valid values are "debug", "info", "warning", "error", "critical".
-			:param message: The message to log.
+			:param message: The message to log. It can be a function that returns the message (or see :func:`lazy`):
+				it is only called if a handler outputs the record.
 			:param *args: See :func:`logging.Logger.log` documentation.
 			:param **kwargs: See :func:`logging.Logger.log` documentation.
 		"""
@@ -166,33 +406,678 @@ class Logger():
 	def debug(self, message, *args, **kwargs):
 		"""
 			Shorthand method for `log("debug", message, *args, **kwargs)`
+			Replaced by :func:`_bindLevelMethods` when the object is created.
 		"""
 		self.log("debug", message, *args, **kwargs)
 
 	def info(self, message, *args, **kwargs):
 		"""
 			Shorthand method for `log("info", message, *args, **kwargs)`
+			Replaced by :func:`_bindLevelMethods` when the object is created.
 		"""
 		self.log("info", message, *args, **kwargs)
 
 	def warning(self, message, *args, **kwargs):
 		"""
 			Shorthand method for `log("warning", message, *args, **kwargs)`
+			Replaced by :func:`_bindLevelMethods` when the object is created.
 		"""
 		self.log("warning", message, *args, **kwargs)
 
 	def error(self, message, *args, **kwargs):
 		"""
 			Shorthand method for `log("error", message, *args, **kwargs)`
+			Replaced by :func:`_bindLevelMethods` when the object is created.
 		"""
 		self.log("error", message, *args, **kwargs)
 
 	def critical(self, message, *args, **kwargs):
 		"""
 			Shorthand method for `log("critical", message, *args, **kwargs)`
+			Replaced by :func:`_bindLevelMethods` when the object is created.
 		"""
 		self.log("critical", message, *args, **kwargs)
 
+def lazy(function, *args, **kwargs):
+	"""
+		Wrap a function so that it is only called when a handler outputs the message.
+		The result can be used as a message or as an argument of a message::
+
+			logger.debug("state: %s", lazy(dump, state))
+
+		The function is called at most once, even when several handlers output the record.
+		With `async_enabled`, it is called on the thread of the handlers.
+	"""
+	return _LazyValue(function, args, kwargs)
+
+def rebind():
+	"""
+		Bind the shorthand methods of every :class:`Logger` again, for their current level.
+		Call it after changing levels with the :mod:`logging` module: `Logger.setLevel` of a :mod:`logging` logger,
+		:func:`logging.disable` or :mod:`logging.config`.
+	"""
+	with _instancesLock:
+		for instance in _instances.values():
+			instance._bindLevelMethods()
+
+class FileWriterProcess():
+	"""
+		A process that writes the records of the loggers of several processes to a single file.
+		It is the only one to open and rotate the file, so records of different processes can't be mixed or lost during a rotation.
+
+		Create it in the main process, call :func:`start`, and give it to the child processes (as an argument of
+		:class:`multiprocessing.Process` or by forking). They create their loggers with the `file_writer` option::
+
+			writer = FileWriterProcess("server", file_name = "server.log")
+			writer.start()
+			# In every child process:
+			logger = Logger(__name__, "info", HANDLER_FILE, file_writer = writer)
+			# When the children are done:
+			writer.stop()
+	"""
+	def __init__(self, name, queueSize = 0, **options):
+		"""
+		:param name: Name of the logger of the writer process.
+		:param queueSize: Maximum number of records waiting to be written. 0 means no limit.
+			When the queue is full, logging calls wait for a free place.
+		:param **options: The `file_` options of :class:`Logger`, used for the file of the writer process.
+			`file_format` contains `%(name)s` by default, so every record shows the name of the logger that created it.
+		"""
+		self.name = name
+		self.options = {"file_format": "=> %(asctime)s [%(name)s][%(levelname)s] %(message)s"}
+		self.options.update(options)
+		self.queue = multiprocessing.Queue(queueSize)
+		self._process = None
+		self._parentPid = os.getpid()
+
+	def __getstate__(self):
+		# Sent to child processes: they only need the queue
+		state = self.__dict__.copy()
+		state["_process"] = None
+		return state
+
+	def start(self):
+		"""
+			Start the writer process.
+		"""
+		self._process = multiprocessing.Process(target = _runFileWriter, args = (self.queue, self.name, self.options),
+			name = "logmodule-writer")
+		self._process.start()
+		atexit.register(self.stop)
+
+	def stop(self):
+		"""
+			Stop the writer process after it wrote all the records sent before this call.
+			Called automatically when the process that started it exits.
+		"""
+		if self._process == None or os.getpid() != self._parentPid:
+			return
+		self.queue.put(None)
+		self._process.join()
+		self._process = None
+
+def _runFileWriter(records, name, options):
+	"""Main function of a FileWriterProcess"""
+	logger = Logger(name, "debug", HANDLER_FILE, **options)
+	listener = logging.handlers.QueueListener(records, *logger._handlers, respect_handler_level = True)
+	while True:
+		record = records.get()
+		if record == None:
+			break
+		listener.handle(record)
+	for handler in logger._handlers:
+		handler.close()
+
+class _LazyValue():
+	"""
+		A value computed the first time it is converted to a string.
+	"""
+	def __init__(self, function, args, kwargs):
+		self._function = function
+		self._args = args
+		self._kwargs = kwargs
+		self._value = None
+		self._evaluated = False
+
+	def value(self):
+		if not self._evaluated:
+			self._value = self._function(*self._args, **self._kwargs)
+			self._evaluated = True
+			self._function = self._args = self._kwargs = None
+		return self._value
+
+	def __str__(self):
+		return str(self.value())
+
+	def __repr__(self):
+		return repr(self.value())
+
+	def __format__(self, format_spec):
+		return format(self.value(), format_spec)
+
+def _messageRecordMaker(logger, braces):
+	"""
+		Return a makeRecord method for a :mod:`logging` logger, that puts the messages that are functions or in the "{" style
+		in a :class:`_Message`: every handler gets the right text from :func:`logging.LogRecord.getMessage`, even the ones of
+		other loggers and of other libraries.
+	"""
+	makeRecord = type(logger).makeRecord
+	def messageMakeRecord(name, level, fn, lno, msg, args, *others, **kwargs):
+		if callable(msg) or (braces and args):
+			msg, args = _Message(msg, args, braces), ()
+		return makeRecord(logger, name, level, fn, lno, msg, args, *others, **kwargs)
+	return messageMakeRecord
+
+class _Message():
+	"""
+		A message merged with its arguments the first time it is converted to a string.
+		Messages that are functions are called, messages in the "{" style are formatted with :func:`str.format`.
+	"""
+	def __init__(self, msg, args, braces):
+		# Like logging.LogRecord: a single dictionary is used for named arguments
+		if len(args) == 1 and isinstance(args[0], collections.abc.Mapping) and args[0]:
+			args = args[0]
+		self._msg = msg
+		self._args = args
+		self._braces = braces
+		self._text = None
+
+	def __str__(self):
+		if self._text == None:
+			msg = self._msg() if callable(self._msg) else self._msg
+			if not self._args:
+				text = str(msg)
+			elif not self._braces:
+				text = str(msg) % self._args
+			elif isinstance(self._args, collections.abc.Mapping):
+				text = str(msg).format(**self._args)
+			else:
+				text = str(msg).format(*self._args)
+			self._text = text
+			self._msg = self._args = None
+		return self._text
+
+	def __repr__(self):
+		return repr(str(self))
+
+class _Formatter(logging.Formatter):
+	"""
+		A Formatter that caches the date of the records, formatted only once per second.
+		Handlers with the same format share their formatter: the text of the last record is kept, so it is formatted once for all of them.
+	"""
+	def __init__(self, fmt = None, datefmt = None):
+		logging.Formatter.__init__(self, fmt, datefmt)
+		self._timeCache = (None, None) # (second, formatted date) of the last record
+		self._last = (_deadRecord, None, None) # (weak reference to the record, its msg, text) of the last record formatted
+
+	def format(self, record):
+		# A weak reference: the cache must not keep a record (and the traceback of its exception) alive.
+		# The message is compared too, in case a filter changed it between two handlers.
+		last = self._last
+		if last[0]() is record and last[1] is record.msg:
+			return last[2]
+		text = self._format(record)
+		self._last = (weakref.ref(record), record.msg, text)
+		return text
+
+	def _format(self, record):
+		return logging.Formatter.format(self, record)
+
+	def formatTime(self, record, datefmt = None):
+		second = int(record.created)
+		cache = self._timeCache
+		if cache[0] != second:
+			cache = (second, time.strftime(datefmt or self.default_time_format, self.converter(record.created)))
+			self._timeCache = cache
+		if datefmt or not self.default_msec_format:
+			return cache[1]
+		return self.default_msec_format % (cache[1], record.msecs)
+
+def _deadRecord():
+	"""Initial value of _Formatter._last: a weak reference to no record"""
+	return None
+
+# Fields available in the "json" format, and the attribute of the record they come from
+_JSON_FIELDS = {
+	"time": "asctime",
+	"created": "created",
+	"name": "name",
+	"level": "levelname",
+	"message": "message",
+	"module": "module",
+	"function": "funcName",
+	"line": "lineno",
+	"path": "pathname",
+	"process": "process",
+	"thread": "threadName",
+}
+
+class _JsonFormatter(_Formatter):
+	"""
+		Formats every record as a compact JSON object on a single line.
+	"""
+	def __init__(self, fields, datefmt = None):
+		_Formatter.__init__(self, None, datefmt)
+		for field in fields:
+			if field not in _JSON_FIELDS:
+				raise ValueError("Unknown json field: %s" % field)
+		self._fields = [(field, operator.attrgetter(_JSON_FIELDS[field])) for field in fields]
+		self._needsTime = "time" in fields
+		self._encode = json.JSONEncoder(ensure_ascii = False, separators = (",", ":"), default = str).encode
+
+	def usesTime(self):
+		return self._needsTime
+
+	def _format(self, record):
+		record.message = record.getMessage()
+		if self._needsTime:
+			record.asctime = self.formatTime(record, self.datefmt)
+		data = {field: getter(record) for field, getter in self._fields}
+		if record.exc_info and not record.exc_text:
+			record.exc_text = self.formatException(record.exc_info)
+		if record.exc_text:
+			data["exception"] = record.exc_text
+		if record.stack_info:
+			data["stack"] = self.formatStack(record.stack_info)
+		return self._encode(data)
+
+class _BackgroundRotatingFileHandler(logging.FileHandler):
+	"""
+		A file handler that rotates the file when it reaches a size and/or after some time.
+		Rotation is a single rename of the file to `<name>.<timestamp>`: compressing the backup and deleting old ones
+		is done by a background thread, so a logging call never waits for more than the rename.
+		The size of the file is counted in memory, it is not read from the file for every record.
+	"""
+	def __init__(self, filename, mode = "a", encoding = None, delay = False, maxBytes = 0, backupCount = 0, interval = None, compression = None):
+		"""
+		:param maxBytes: The file rotates when it would exceed this size. 0 or None: no rotation on size.
+		:param backupCount: How many backups are kept. 0: backups are never deleted.
+		:param interval: The file rotates after this number of seconds. None: no rotation on time.
+		:param compression: None, "gzip" or "zstd".
+		"""
+		if compression not in (None, "gzip", "zstd"):
+			raise ValueError("compression must be None, 'gzip' or 'zstd'")
+		if compression == "zstd" and zstandard == None:
+			raise ImportError("zstd compression needs the zstandard package: pip install zstandard")
+		logging.FileHandler.__init__(self, filename, mode, encoding, delay)
+		self.maxBytes = maxBytes
+		self.backupCount = backupCount
+		self.interval = interval
+		self.compression = compression
+		self._size = 0
+		if "a" in mode and os.path.exists(self.baseFilename):
+			self._size = os.path.getsize(self.baseFilename)
+		self._rolloverAt = time.time() + interval if interval else None
+		self._tasks = queue.Queue() # Backups waiting for the background thread
+		self._worker = None
+
+	def emit(self, record):
+		try:
+			self._write(self.format(record) + self.terminator)
+			self.flush()
+		except RecursionError:
+			raise
+		except Exception:
+			self.handleError(record)
+
+	def _write(self, msg):
+		"""Write some text to the file, after a rotation if needed"""
+		size = len(msg) if msg.isascii() else len(msg.encode(self.encoding or "utf-8"))
+		if self._shouldRollover(size):
+			self._doRollover()
+		if self.stream == None:
+			self.stream = self._open()
+		self.stream.write(msg)
+		self._size += size
+
+	def _shouldRollover(self, size):
+		if self.maxBytes and self._size > 0 and self._size + size > self.maxBytes:
+			return True
+		return self._rolloverAt != None and time.time() >= self._rolloverAt
+
+	def _doRollover(self):
+		if self.stream != None:
+			self.stream.close()
+			self.stream = None
+		if os.path.exists(self.baseFilename):
+			backup = "%s.%s" % (self.baseFilename, datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f"))
+			os.rename(self.baseFilename, backup)
+			self._startWorker()
+			self._tasks.put(backup)
+		self._size = 0
+		if self.interval:
+			self._rolloverAt = time.time() + self.interval
+
+	def _startWorker(self):
+		if self._worker == None:
+			self._worker = threading.Thread(target = self._work, name = "logmodule-rotation", daemon = True)
+			self._worker.start()
+
+	def _work(self):
+		"""Compress backups and delete the old ones. Runs on the background thread until None is received."""
+		while True:
+			backup = self._tasks.get()
+			if backup == None:
+				return
+			try:
+				self._compress(backup)
+				self._deleteOldBackups()
+			except Exception:
+				_reportError()
+
+	def _compress(self, backup):
+		if self.compression == None or not os.path.exists(backup): # It may already be deleted by _deleteOldBackups
+			return
+		with open(backup, "rb") as source:
+			if self.compression == "gzip":
+				with gzip.open(backup + ".gz", "wb") as destination:
+					shutil.copyfileobj(source, destination)
+			else:
+				with open(backup + ".zst", "wb") as destination:
+					zstandard.ZstdCompressor().copy_stream(source, destination)
+		os.remove(backup)
+
+	def _deleteOldBackups(self):
+		if self.backupCount <= 0:
+			return
+		# Timestamps sort in chronological order
+		backups = sorted(glob.glob(glob.escape(self.baseFilename) + ".[0-9]*"))
+		for backup in backups[:-self.backupCount]:
+			os.remove(backup)
+
+	def close(self):
+		"""
+			Close the file and wait for the background thread to process the remaining backups.
+		"""
+		logging.FileHandler.close(self)
+		if self._worker != None:
+			self._tasks.put(None)
+			self._worker.join()
+			self._worker = None
+
+class _BufferedMixin():
+	"""
+		Makes a file handler keep the formatted records in memory and write them to the file with a single write when:
+
+		- the buffer contains bufferBytes characters or bufferRecords records
+		- the oldest record of the buffer is older than bufferMillis. A background thread also writes the buffer every bufferMillis.
+		- a record of flushLevel or higher is logged
+		- the handler is flushed or closed (:func:`logging.shutdown` does it when the program exits)
+
+		It must come before the handler class in the bases of a class. That class defines `_writeBuffer(records)`, which writes a list of formatted records.
+	"""
+	def __init__(self, filename, bufferBytes = 64*1024, bufferRecords = 1000, bufferMillis = 1000, flushLevel = logging.ERROR, **kwargs):
+		super().__init__(filename, **kwargs)
+		self.bufferBytes = bufferBytes
+		self.bufferRecords = bufferRecords
+		self.bufferMillis = bufferMillis
+		self.flushLevel = flushLevel
+		self._buffer = []
+		self._bufferSize = 0
+		self._bufferStart = 0 # When the oldest record of the buffer was added
+		self._stopFlushing = threading.Event() # Set when the handler is closed. logging.Handler already uses _closed.
+		if bufferMillis:
+			threading.Thread(target = self._flushPeriodically, name = "logmodule-flush", daemon = True).start()
+
+	def emit(self, record):
+		try:
+			msg = self.format(record) + self.terminator
+			if not self._buffer:
+				self._bufferStart = time.monotonic()
+			self._buffer.append(msg)
+			self._bufferSize += len(msg)
+			if (self._bufferSize >= self.bufferBytes or len(self._buffer) >= self.bufferRecords or record.levelno >= self.flushLevel
+					or (self.bufferMillis and (time.monotonic() - self._bufferStart) * 1000 >= self.bufferMillis)):
+				self.flush()
+		except RecursionError:
+			raise
+		except Exception:
+			self.handleError(record)
+
+	def flush(self):
+		self.acquire()
+		try:
+			if self._buffer:
+				records = self._buffer
+				self._buffer = []
+				self._bufferSize = 0
+				self._writeBuffer(records)
+			super().flush()
+		finally:
+			self.release()
+
+	def _flushPeriodically(self):
+		while not self._stopFlushing.wait(self.bufferMillis / 1000):
+			try:
+				self.flush()
+			except Exception:
+				_reportError()
+
+	def close(self):
+		# Can be called twice: by the _SharedFileHandler that uses this handler, and by logging.shutdown
+		self._stopFlushing.set()
+		# FileHandler.close only flushes an open stream: with delay, the buffer may be the only thing that would open it
+		self.acquire()
+		try:
+			self.flush()
+		finally:
+			self.release()
+		super().close()
+
+class _BufferedWatchedFileHandler(_BufferedMixin, logging.handlers.WatchedFileHandler):
+	def _writeBuffer(self, records):
+		self.reopenIfNeeded()
+		if self.stream == None:
+			self.stream = self._open()
+		self.stream.write("".join(records))
+
+class _BufferedRotatingFileHandler(_BufferedMixin, logging.handlers.RotatingFileHandler):
+	def _writeBuffer(self, records):
+		if self.stream == None:
+			self.stream = self._open()
+		# Same test as RotatingFileHandler.shouldRollover: the buffer is split where the file must rotate
+		size = self.stream.tell()
+		chunk = []
+		for msg in records:
+			if self.maxBytes > 0 and size > 0 and size + len(msg) >= self.maxBytes:
+				self.stream.write("".join(chunk))
+				chunk = []
+				self.doRollover()
+				if self.stream == None:
+					self.stream = self._open()
+				size = self.stream.tell()
+			chunk.append(msg)
+			size += len(msg)
+		self.stream.write("".join(chunk))
+
+class _BufferedBackgroundRotatingFileHandler(_BufferedMixin, _BackgroundRotatingFileHandler):
+	def _writeBuffer(self, records):
+		# Records are written in chunks of at most maxBytes, so _write can rotate between them
+		chunk = []
+		size = 0
+		for msg in records:
+			if chunk and self.maxBytes and self._size + size + len(msg) > self.maxBytes:
+				self._write("".join(chunk))
+				chunk = []
+				size = 0
+			chunk.append(msg)
+			size += len(msg)
+		if chunk:
+			self._write("".join(chunk))
+
+class _SharedFileHandler(logging.Handler):
+	"""
+		Formats records with the formatter of one Logger, and gives the result to the handler of a file shared by several loggers.
+		The handler of the file is created by the first _SharedFileHandler of this file, and closed with the last one.
+	"""
+	def __init__(self, path, create):
+		"""
+		:param path: Absolute name of the file.
+		:param create: Function that returns a new handler for the file, called if no logger uses it yet.
+		"""
+		logging.Handler.__init__(self)
+		self.path = path
+		with _instancesLock:
+			if path not in _fileHandlers:
+				target = create()
+				target.setFormatter(_FormattedText())
+				_fileHandlers[path] = [target, 0]
+			_fileHandlers[path][1] += 1
+			self.target = _fileHandlers[path][0]
+		self.encoding = getattr(self.target, "encoding", None)
+
+	def emit(self, record):
+		try:
+			record.formattedText = self.format(record)
+		except Exception:
+			self.handleError(record)
+			return
+		self.target.handle(record)
+
+	def flush(self):
+		if self.target != None:
+			self.target.flush()
+
+	def close(self):
+		with _instancesLock:
+			if self.target != None:
+				shared = _fileHandlers[self.path]
+				shared[1] -= 1
+				if shared[1] == 0:
+					del _fileHandlers[self.path]
+					shared[0].close()
+				self.target = None
+		logging.Handler.close(self)
+
+class _FormattedText(logging.Formatter):
+	"""Formatter of the handler of a shared file: records were already formatted by the _SharedFileHandler of their logger"""
+	def format(self, record):
+		return record.formattedText
+
+class _LevelCounter():
+	"""
+		Filter of the :mod:`logging` logger when `stats_enabled` is True: counts the records of every level, and lets all of them through.
+	"""
+	def __init__(self):
+		self.counts = {}
+		self._lock = threading.Lock()
+
+	def filter(self, record):
+		level = record.levelname.lower()
+		with self._lock:
+			self.counts[level] = self.counts.get(level, 0) + 1
+		return True
+
+	def snapshot(self):
+		with self._lock:
+			return dict(self.counts)
+
+class _HandlerStats():
+	"""
+		Counters of one handler when `stats_enabled` is True.
+		They are updated by wrappers of the format, emit and filter methods of the handler, so nothing is added to handlers
+		of loggers without statistics.
+	"""
+	def __init__(self, handler):
+		self.records = 0
+		self.dropped = 0
+		self.bytes = 0
+		self.formatSeconds = 0.0
+		self.emitSeconds = 0.0
+		self._lock = threading.Lock()
+		self._encoding = getattr(handler, "encoding", None) or getattr(getattr(handler, "stream", None), "encoding", None) or "utf-8"
+		self._format = handler.format
+		self._emit = handler.emit
+		self._filter = handler.filter
+		handler.format = self.format
+		handler.emit = self.emit
+		handler.filter = self.filter
+
+	def format(self, record):
+		start = time.perf_counter()
+		text = self._format(record)
+		duration = time.perf_counter() - start
+		size = len(text.encode(self._encoding, "replace"))
+		with self._lock:
+			self.formatSeconds += duration
+			self.bytes += size
+		return text
+
+	def emit(self, record):
+		start = time.perf_counter()
+		self._emit(record)
+		duration = time.perf_counter() - start
+		with self._lock:
+			self.records += 1
+			self.emitSeconds += duration
+
+	def filter(self, record):
+		result = self._filter(record)
+		if not result:
+			with self._lock:
+				self.dropped += 1
+		return result
+
+	def snapshot(self):
+		with self._lock:
+			return {
+				"records": self.records,
+				"dropped": self.dropped,
+				"bytes": self.bytes,
+				"format_seconds": self.formatSeconds,
+				"emit_seconds": self.emitSeconds,
+			}
+
+def _reportError():
+	"""
+		Print the exception being handled by a background thread of a handler.
+		There is no record to pass to :func:`logging.Handler.handleError`, but the error is printed the same way.
+	"""
+	if logging.raiseExceptions:
+		import traceback
+		traceback.print_exc(file = sys.stderr)
+
+class _QueueHandler(logging.handlers.QueueHandler):
+	"""
+		Puts records in a queue, where they are taken by a :class:`_QueueListener`.
+		Records are not formatted here: formatting is done by the handlers of the listener, on its thread.
+	"""
+	def __init__(self, records, drop):
+		"""
+		:param records: The queue.
+		:param drop: If True, records are discarded when the queue is full, otherwise the caller waits for a free place.
+		"""
+		logging.handlers.QueueHandler.__init__(self, records)
+		self.drop = drop
+		self.dropped = 0 # Number of records discarded because the queue was full
+
+	def prepare(self, record):
+		return record
+
+	def enqueue(self, record):
+		if self.drop:
+			try:
+				self.queue.put_nowait(record)
+			except queue.Full:
+				self.dropped += 1
+		else:
+			self.queue.put(record)
+
+class _ProcessQueueHandler(logging.handlers.QueueHandler):
+	"""
+		Sends records to a :class:`FileWriterProcess`. Records are prepared as by QueueHandler (message merged with its arguments,
+		so they can be pickled), but when the queue is full the caller waits for a free place instead of losing the record.
+	"""
+	def enqueue(self, record):
+		self.queue.put(record)
+
+class _QueueListener(logging.handlers.QueueListener):
+	"""
+		A QueueListener that waits for a free place in the queue when it is stopped, instead of failing if the queue is full.
+	"""
+	def enqueue_sentinel(self):
+		self.queue.put(self._sentinel)
+
 class _MaxLevelFilter():
 	"""
 		Allows only messages with level < Level attribute. Note that it is 'strictly lower', because logger.setLevel is inclusive.
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# coding=utf-8
+# Benchmarks for logmodule.py.
+# Run it with `python -m logmoduleBenchmark`. Results are printed as JSON so they can be compared between versions.
+#
+# Copyright (C) 2016 Elnath < elnathbeta@gmail.com >
+#
+# Licensed under the MIT license:
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+# THE SOFTWARE.
+#
+# Except as contained in this notice, the name(s) of (the) Author shall not be used in advertising or
+# otherwise to promote the sale, use or other dealings in this Software without
+# prior written authorization from (the)Author.
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+import timeit
+
+import logmodule
+
+
+def bench_calls(number = 200000):
+	"""
+	Measures the cost of one call to a shorthand method, for a disabled level and for an enabled level,
+	without and with the `stats_enabled` option.
+	Enabled records are written to the null device, so the result is mostly the cost of logmodule and :mod:`logging`.
+
+	:return: A dict with the cost of every kind of call in nanoseconds.
+	"""
+	logger = logmodule.Logger("logmoduleBenchmark.calls", "warning", logmodule.HANDLER_FILE,
+		file_name = os.devnull, file_rotating = False, file_delay = False)
+	counted = logmodule.Logger("logmoduleBenchmark.stats", "warning", logmodule.HANDLER_FILE,
+		file_name = os.devnull, file_rotating = False, file_delay = False, stats_enabled = True)
+	results = {}
+	for name, statement in (("disabled_debug", lambda: logger.debug("message %s", 1)),
+			("enabled_warning", lambda: logger.warning("message %s", 1)),
+			("disabled_debug_stats", lambda: counted.debug("message %s", 1)),
+			("enabled_warning_stats", lambda: counted.warning("message %s", 1))):
+		seconds = min(timeit.repeat(statement, number = number, repeat = 3))
+		results[name + "_ns"] = seconds / number * 1e9
+	return results
+
+
+def _produce(writer, records):
+	"""Main function of a producer process of :func:`bench_processes`"""
+	logger = logmodule.Logger("logmoduleBenchmark.producer", "info", logmodule.HANDLER_FILE, file_writer = writer)
+	for i in range(records):
+		logger.info("record %d of process %d", i, os.getpid())
+
+
+def bench_processes(producers = 4, records = 20000):
+	"""
+	Measures the throughput of several processes logging to the same file through a :class:`logmodule.FileWriterProcess`.
+
+	:return: A dict with the number of records written per second, and whether the file contains every record.
+	"""
+	directory = tempfile.mkdtemp(prefix = "logmodulebench")
+	try:
+		file_name = os.path.join(directory, "processes.log")
+		writer = logmodule.FileWriterProcess("logmoduleBenchmark.writer", file_name = file_name, file_rotating = False)
+		writer.start()
+		start = time.time()
+		processes = [multiprocessing.Process(target = _produce, args = (writer, records)) for i in range(producers)]
+		for process in processes:
+			process.start()
+		for process in processes:
+			process.join()
+		writer.stop()
+		seconds = time.time() - start
+		with open(file_name) as log:
+			lines = sum(1 for line in log)
+	finally:
+		shutil.rmtree(directory)
+	return {
+		"producers": producers,
+		"records": producers * records,
+		"records_per_second": producers * records / seconds,
+		"complete": lines == producers * records,
+	}
+
+
+BENCHMARKS = {
+	"calls": bench_calls,
+	"processes": bench_processes,
+}
+
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Benchmarks for logmodule")
+	parser.add_argument("--benchmarks", nargs = "+", choices = sorted(BENCHMARKS), help = "benchmarks to run (default: all)")
+	parser.add_argument("--producers", type = int, default = 4, help = "number of producer processes of the processes benchmark (default: 4)")
+	parser.add_argument("--output", help = "file where the JSON results are written (default: stdout)")
+	args = parser.parse_args(argv)
+
+	arguments = {"processes": {"producers": args.producers}}
+	report = {
+		"python": sys.version.split()[0],
+		"platform": sys.platform,
+		"results": {name: BENCHMARKS[name](**arguments.get(name, {})) for name in args.benchmarks or sorted(BENCHMARKS)},
+	}
+	if args.output:
+		with open(args.output, "w") as output:
+			json.dump(report, output, indent = 2)
+	else:
+		json.dump(report, sys.stdout, indent = 2)
+		print()
+
+
+if __name__ == "__main__":
+	main()